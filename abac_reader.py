@@ -1,5 +1,72 @@
+import argparse
+import multiprocessing
+import os
+import pickle
 import re
+import struct
 import sys
+from array import array
+
+import profiling
+
+# caches of the parsed values, emptied at the end of every iter_policy and bounded to VALUE_CACHE_SIZE entries
+# (_sets only holds the sets of the entities being parsed), so they never keep a copy of a large policy
+_sets = {}
+_singletons = {}
+_values = {}
+VALUE_CACHE_SIZE = 1 << 16
+EMPTY = frozenset()
+
+
+# Function to intern a parsed value so that equal values share a single object
+def intern_value(value):
+    if isinstance(value, frozenset):
+        return _sets.setdefault(value, value)
+    return sys.intern(value)
+
+
+# Function to parse an attribute value, {a b} is a set of tokens and anything else is a scalar
+# the raw strings repeat a lot in a policy so the parsed values are cached
+def parse_value(raw):
+    value = _values.get(raw)
+    if value is None:
+        value = raw.strip()
+        if value.startswith('{') and value.endswith('}'):
+            value = intern_value(frozenset(sys.intern(i) for i in value[1:-1].split()))
+        else:
+            value = sys.intern(value)
+        if len(_values) >= VALUE_CACHE_SIZE:
+            _values.clear()
+        _values[raw] = value
+    return value
+
+
+# Function to empty the caches of the parsed values
+def clear_value_caches():
+    _sets.clear()
+    _singletons.clear()
+    _values.clear()
+
+
+# Function to parse a set of sets such as {{a b} {c}}, a plain set is read as a single alternative
+def parse_set_of_sets(value):
+    value = value.strip()
+    alternatives = re.findall(r'\{([^{}]*)\}', value[1:-1])
+    if not alternatives:
+        return [as_set(parse_value(value))]
+    return [intern_value(frozenset(sys.intern(j) for j in i.split())) for i in alternatives]
+
+
+# Function to view a parsed value as a set, the singletons are cached to keep the checks allocation free
+def as_set(value):
+    if isinstance(value, frozenset):
+        return value
+    singleton = _singletons.get(value)
+    if singleton is None:
+        if len(_singletons) >= VALUE_CACHE_SIZE:
+            _singletons.clear()
+        singleton = _singletons[value] = frozenset((value,))
+    return singleton
 
 
 # Function to parse attribute value conditions
@@ -10,10 +77,10 @@ def attr_value(conditions):
             continue
         if ' in ' in i:
             name, value = i.split(' in ')
-            data['in'].append([name.strip(), value.strip()])
+            data['in'].append([sys.intern(name.strip()), as_set(parse_value(value))])
         elif ' supseteqln ' in i:
             name, value = i.split(' supseteqln ')
-            data['supseteqln'].append([name.strip(), value.strip()])
+            data['supseteqln'].append([sys.intern(name.strip()), parse_set_of_sets(value)])
         else:
             print("Condition not found: ", i)
     return data
@@ -27,133 +94,609 @@ def attr_attrib(conditions):
             continue
         if '<' in i:
             name, value = i.split('<')
-            data['<'].append([name.strip(), value.strip()])
+            data['<'].append([sys.intern(name.strip()), sys.intern(value.strip())])
         elif '>' in i:
             name, value = i.split('>')
-            data['>'].append([name.strip(), value.strip()])
+            data['>'].append([sys.intern(name.strip()), sys.intern(value.strip())])
         elif '=' in i:
             name, value = i.split('=')
-            data['='].append([name.strip(), value.strip()])
+            data['='].append([sys.intern(name.strip()), sys.intern(value.strip())])
         elif ']' in i:
             name, value = i.split(']')
-            data[']'].append([name.strip(), value.strip()])
+            data[']'].append([sys.intern(name.strip()), sys.intern(value.strip())])
         else:
             print("Condition not found: ", i)
     return data
 
 
-# Function to check attribute value conditions
-def attr_value_check(data, element):
-    for i in data['in']:
-        if i[0] not in element:
-            return False
-        if element[i[0]] not in i[1]:
-            return False
-    for i in data['supseteqln']:
-        if i[0] not in element:
-            return False
-        if not set(i[1]).issubset(set(element[i[0]])):
-            return False
+def _always(*_):
     return True
 
 
-# Function to check attribute attribute conditions
-def attr_attrib_check(data, user, resource):
-    for i in data['<']:
-        if i[0] not in user or i[1] not in resource:
+# Function to compile one attribute value condition into a check on an element
+def compile_attr_value_condition(operator, name, value):
+    if operator == 'in':
+        def check(element):
+            return element.get(name) in value
+    else:
+        def check(element):
+            attribute = element.get(name)
+            if attribute is None:
+                return False
+            attribute = as_set(attribute)
+            for alternative in value:
+                if attribute >= alternative:
+                    return True
             return False
-        if not set(resource[i[0]]).issubset(set(user[i[1]])):
-            return False
-    for i in data['>']:
-        if i[0] not in user or i[1] not in resource:
-            return False
-        if not set(user[i[0]]).issubset(set(resource[i[1]])):
-            return False
-    for i in data['=']:
-        if i[0] not in user or i[1] not in resource:
-            return False
-        if user[i[0]] != resource[i[0]]:
-            return False
-    for i in data[']']:
-        if i[0] not in user or i[1] not in resource:
-            return False
-        if resource[i[1]] not in user[i[0]]:
-            return False
-    return True
+    return check
 
 
-# Function to generate data to the visualisation
-# the data is saved in data.txt
-# the first line is the list of users (uid)
-# the second line is the list of resources (rid)
-# the third line is a dictionary of the form {(uid,rid):{operations}} it's corresponding of the authorization user/resource/operation
-def gen_data(file_path):
+# Function to compile attribute value conditions into a single check on an element
+def compile_attr_value(data):
+    checks = [compile_attr_value_condition(operator, name, value)
+              for operator in ('in', 'supseteqln') for name, value in data[operator]]
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(element):
+        for condition in checks:
+            if not condition(element):
+                return False
+        return True
+    return check
+
+
+# Function to compile one attribute attribute condition into a check on a user/resource pair
+# ua = ra equality, ua ] ra ua contains ra, ua > ra ua is a superset of ra, ua < ra ua is a subset of ra
+def compile_attr_attrib_condition(operator, user_attr, resource_attr):
+    if operator == '=':
+        def check(user, resource):
+            value = user.get(user_attr)
+            return value is not None and value == resource.get(resource_attr)
+    elif operator == ']':
+        def check(user, resource):
+            value = user.get(user_attr)
+            if value is None or resource_attr not in resource:
+                return False
+            return resource[resource_attr] in as_set(value)
+    elif operator == '>':
+        def check(user, resource):
+            value = user.get(user_attr)
+            if value is None or resource_attr not in resource:
+                return False
+            return as_set(value) >= as_set(resource[resource_attr])
+    else:
+        def check(user, resource):
+            value = user.get(user_attr)
+            if value is None or resource_attr not in resource:
+                return False
+            return as_set(value) <= as_set(resource[resource_attr])
+    return check
+
+
+# Function to compile attribute attribute conditions into a single check on a user/resource pair
+def compile_attr_attrib(data):
+    checks = [compile_attr_attrib_condition(operator, user_attr, resource_attr)
+              for operator in ('=', ']', '<', '>') for user_attr, resource_attr in data[operator]]
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(user, resource):
+        for condition in checks:
+            if not condition(user, resource):
+                return False
+        return True
+    return check
+
+
+# Function to compile a rule into its user, resource and user/resource checks
+def compile_rule(rule):
+    return compile_attr_value(rule['user']), compile_attr_value(rule['resource']), compile_attr_attrib(rule['resource_user'])
+
+
+# Function to build the inverted indexes of a list of parsed users or resources
+# scalar maps (attribute, value) to the entities having this value
+# member maps (attribute, token) to the entities whose set contains this token, a scalar is a singleton set there
+# like in the compiled supseteqln check (as_set)
+# has maps an attribute to the entities defining it
+def build_index(entities):
+    index = {'scalar': {}, 'member': {}, 'has': {}}
+    for position, entity in enumerate(entities):
+        for name, value in entity.items():
+            index['has'].setdefault(name, set()).add(position)
+            if isinstance(value, frozenset):
+                for token in value:
+                    index['member'].setdefault((name, token), set()).add(position)
+            else:
+                index['scalar'].setdefault((name, value), set()).add(position)
+                index['member'].setdefault((name, value), set()).add(position)
+    return index
+
+
+# Function to resolve attribute value conditions by intersecting the inverted indexes
+# the result is a sorted list of positions, restricted to the given positions if any
+def resolve_attr_value(data, index, size, positions=None):
+    candidates = None
+    for name, value in data['in']:
+        matched = set()
+        for token in value:
+            matched |= index['scalar'].get((name, token), set())
+        candidates = matched if candidates is None else candidates & matched
+    for name, value in data['supseteqln']:
+        matched = set()
+        for alternative in value:
+            ids = index['has'].get(name, set())
+            for token in alternative:
+                ids = ids & index['member'].get((name, token), set())
+            matched |= ids
+        candidates = matched if candidates is None else candidates & matched
+    if positions is None:
+        return list(range(size)) if candidates is None else sorted(candidates)
+    if candidates is None:
+        return sorted(positions)
+    return sorted(i for i in positions if i in candidates)
+
+
+# Function to hash join users and resources on the attribute attribute conditions
+# one condition drives the join, the generated pairs are then checked against the compiled rule when it has more
+def join_attr_attrib(data, check, users, resources, user_ids, resource_ids):
+    conditions = [(operator, name, value) for operator in ('=', ']', '<', '>') for name, value in data[operator]]
+    if not conditions:
+        for ui in user_ids:
+            for ri in resource_ids:
+                yield ui, ri
+        return
+    operator, user_attr, resource_attr = conditions[0]
+    residual = len(conditions) > 1
+
+    # build the hash table on the resource side
+    table = {}
+    empty = []
+    for ri in resource_ids:
+        value = resources[ri].get(resource_attr)
+        if value is None:
+            continue
+        if operator in ('=', ']'):
+            table.setdefault(value, []).append(ri)
+        else:
+            value = as_set(value)
+            if not value:
+                empty.append(ri)
+            for token in value:
+                table.setdefault(token, set()).add(ri)
+
+    # probe it with every user
+    for ui in user_ids:
+        value = users[ui].get(user_attr)
+        if value is None:
+            continue
+        if operator == '=':
+            matched = table.get(value, [])
+        elif operator == ']':
+            matched = [ri for token in as_set(value) for ri in table.get(token, [])]
+        elif operator == '<':
+            matched = None
+            for token in as_set(value):
+                matched = table.get(token, set()) if matched is None else matched & table.get(token, set())
+            if matched is None:
+                matched = [ri for ri in resource_ids if resource_attr in resources[ri]]
+        else:
+            counts = {}
+            for token in as_set(value):
+                for ri in table.get(token, ()):
+                    counts[ri] = counts.get(ri, 0) + 1
+            matched = empty + [ri for ri, count in counts.items()
+                               if count == len(as_set(resources[ri][resource_attr]))]
+        user = users[ui]
+        for ri in matched:
+            if not residual or check(user, resources[ri]):
+                yield ui, ri
+
+
+POLICY_LINE = re.compile(r'\s*(rule|userAttrib|resourceAttrib)\s*\((.*?)\)')
+
+
+# Function to parse the body of a rule(...) line
+def parse_rule(body):
+    rule = body.split(';')
+    data = {"name": rule[0]}
+    user_conditions = rule[1].split(',')
+    data['user'] = attr_value(user_conditions)
+    resource_conditions = rule[2].split(',')
+    data['resource'] = attr_value(resource_conditions)
+    operations = rule[3].split('{')[1].split('}')[0].split(' ')
+    data['operations'] = operations
+    resource_user_conditions = rule[4].split(',')
+    data['resource_user'] = attr_attrib(resource_user_conditions)
+    return data
+
+
+# Function to parse the body of a userAttrib(...) or resourceAttrib(...) line, key is uid or rid
+def parse_entity(body, key):
+    entity = body.split(',')
+    data = {key: sys.intern(entity[0])}
+    entity = entity[1:]
+    for i in entity:
+        name, _, value = i.partition('=')
+        data[sys.intern(name.strip())] = parse_value(value)
+    return data
+
+
+PARSERS = {
+    'rule': parse_rule,
+    'userAttrib': lambda body: parse_entity(body, 'uid'),
+    'resourceAttrib': lambda body: parse_entity(body, 'rid'),
+}
+
+
+# Function to read a policy file incrementally and yield (kind, data) records
+# kind is rule, userAttrib or resourceAttrib, comments and other lines are skipped
+# the caches of the parsed values only live while the file is read
+def iter_policy(file):
     try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-    except FileNotFoundError:
-        print("File not found")
-        exit(1)
+        for line in file:
+            if line[0] == '#':
+                continue
+            match = POLICY_LINE.match(line)
+            if match is None:
+                continue
+            kind, body = match.groups()
+            yield kind, PARSERS[kind](body)
+    finally:
+        clear_value_caches()
+
 
+# Function to parse a policy file into users, resources and rules
+def parse_policy(file_path):
     users = []
     resources = []
     rules = []
+    records = {'rule': rules, 'userAttrib': users, 'resourceAttrib': resources}
+    try:
+        with profiling.span("parse_policy", file=file_path), open(file_path, 'r', buffering=1 << 20) as file:
+            for kind, data in iter_policy(file):
+                records[kind].append(data)
+    except FileNotFoundError:
+        print("File not found")
+        exit(1)
+    profiling.count("policy rows", len(users) + len(resources) + len(rules))
+    return users, resources, rules
+
+
+# Function to evaluate the rules by checking every user/resource pair
+def evaluate_rules(rules, users, resources):
+    output = {}
+    for rule in rules:
+        user_check, resource_check, check = compile_rule(rule)
+        user_verified = [user for user in users if user_check(user)]
+        resource_verified = [resource for resource in resources if resource_check(resource)]
+        hits = 0
+        with profiling.span("rule", rule=rule["name"]):
+            for user in user_verified:
+                for resource in resource_verified:
+                    if check(user, resource):
+                        add_operations(output, (user['uid'], resource['rid']), rule['operations'])
+                        hits += 1
+        profiling.count("pairs checked", len(user_verified) * len(resource_verified))
+        profiling.count(f"rule hits/{rule['name']}", hits)
+    return output
+
+
+# Function to add the operations granted by a rule, a pair granted by several rules gets the union of their operations
+def add_operations(output, key, operations):
+    if key in output:
+        output[key].update(operations)
+    else:
+        output[key] = set(operations)
+
+
+# Function to generate the (user, resource) positions matched by a rule with the inverted indexes
+# user_positions and resource_positions restrict the users and resources to some positions
+def match_rule(rule, users, resources, user_index, resource_index, user_positions=None, resource_positions=None):
+    _, _, check = compile_rule(rule)
+    user_ids = resolve_attr_value(rule['user'], user_index, len(users), user_positions)
+    resource_ids = resolve_attr_value(rule['resource'], resource_index, len(resources), resource_positions)
+    return join_attr_attrib(rule['resource_user'], check, users, resources, user_ids, resource_ids)
+
+
+# Function to evaluate the rules with the inverted indexes, only the matching pairs are generated
+def evaluate_rules_indexed(rules, users, resources):
+    user_index = build_index(users)
+    resource_index = build_index(resources)
+    output = {}
+    for rule in rules:
+        hits = 0
+        with profiling.span("rule", rule=rule["name"]):
+            for ui, ri in match_rule(rule, users, resources, user_index, resource_index):
+                add_operations(output, (users[ui]['uid'], resources[ri]['rid']), rule['operations'])
+                hits += 1
+        profiling.count(f"rule hits/{rule['name']}", hits)
+    return output
+
+
+# tables of the worker processes, set once per process by _init_worker
+_shared = {}
+
 
-    for line in lines:
-        rule = re.findall(r'rule\s*\((.*?)\)', line)
-        if len(rule) == 1:
-            rule = rule[0].split(';')
-            data = {"name": rule[0]}
-            user_conditions = rule[1].split(',')
-            data['user'] = attr_value(user_conditions)
-            resource_conditions = rule[2].split(',')
-            data['resource'] = attr_value(resource_conditions)
-            operations = rule[3].split('{')[1].split('}')[0].split(' ')
-            data['operations'] = operations
-            resource_user_conditions = rule[4].split(',')
-            data['resource_user'] = attr_attrib(resource_user_conditions)
-            rules.append(data)
-        user = re.findall(r'userAttrib\s*\((.*?)\)', line)
-        if len(user) == 1:
-            user = user[0].split(',')
-            data = {'uid': user[0]}
-            user = user[1:]
-            for i in user:
-                data[i.split('=')[0].strip()] = i.split('=')[1].strip()
-            users.append(data)
-        resource = re.findall(r'resourceAttrib\s*\((.*?)\)', line)
-        if len(resource) == 1:
-            resource = resource[0].split(',')
-            data = {'rid': resource[0]}
-            resource = resource[1:]
-            for i in resource:
-                data[i.split('=')[0].strip()] = i.split('=')[1].strip()
-            resources.append(data)
+def _init_worker(users, resources, rules, rule_masks, user_index, resource_index):
+    _shared.update(users=users, resources=resources, rules=rules, rule_masks=rule_masks,
+                   user_index=user_index, resource_index=resource_index)
 
+
+# Function to match every rule against one block of users in a worker
+# the operations of a pair are merged as a bitmask over rule_operations, the pairs are returned as flat uint32 arrays
+def _evaluate_block(block):
+    masks = {}
+    for rule, mask in zip(_shared['rules'], _shared['rule_masks']):
+        for pair in match_rule(rule, _shared['users'], _shared['resources'],
+                               _shared['user_index'], _shared['resource_index'], range(*block)):
+            masks[pair] = masks.get(pair, 0) | mask
+    user_ids = array('I', (ui for ui, _ in masks))
+    resource_ids = array('I', (ri for _, ri in masks))
+    return user_ids, resource_ids, list(masks.values())
+
+
+# Function to evaluate the rules in a process pool, every worker handles whole blocks of users
+# with fork the parsed tables and indexes are inherited copy-on-write, otherwise they are sent once per worker
+# fork is only used on Linux, macOS spawns by default since forking after system libraries started threads is unsafe
+def evaluate_rules_parallel(rules, users, resources, workers):
+    operations = sorted({operation for rule in rules for operation in rule['operations']})
+    bits = {operation: 1 << i for i, operation in enumerate(operations)}
+    rule_masks = [sum(bits[operation] for operation in set(rule['operations'])) for rule in rules]
+    user_index = build_index(users)
+    resource_index = build_index(resources)
+    size = max(1, -(-len(users) // (4 * workers)))
+    blocks = [(start, min(start + size, len(users))) for start in range(0, len(users), size)]
+
+    context = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
     output = {}
+    decoded = {}
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(users, resources, rules, rule_masks, user_index, resource_index)) as pool:
+        for user_ids, resource_ids, masks in pool.imap_unordered(_evaluate_block, blocks):
+            for ui, ri, mask in zip(user_ids, resource_ids, masks):
+                if mask not in decoded:
+                    decoded[mask] = [operation for operation in operations if bits[operation] & mask]
+                output[(users[ui]['uid'], resources[ri]['rid'])] = set(decoded[mask])
+    return output
+
+
+ENGINES = {'indexed': evaluate_rules_indexed, 'nested': evaluate_rules}
+
+
+# Function to key the rules by name, a repeated name gets the position of the repetition
+def rule_keys(rules):
+    keys = []
+    seen = {}
     for rule in rules:
-        user_verified = []
-        for user in users:
-            if attr_value_check(rule['user'], user):
-                user_verified.append(user)
-        resource_verified = []
-        for resource in resources:
-            if attr_value_check(rule['resource'], resource):
-                resource_verified.append(resource)
-        for user in user_verified:
-            for resource in resource_verified:
-                if attr_attrib_check(rule['resource_user'], user, resource):
-                    output[(user['uid'], resource['rid'])] = set(rule['operations'])
+        count = seen[rule['name']] = seen.get(rule['name'], 0) + 1
+        keys.append(rule['name'] if count == 1 else f"{rule['name']}#{count}")
+    return keys
+
+
+# Function to compute the pairs matched by every rule, as {rule key: {(uid, rid)}}
+def evaluate_rule_matches(rules, users, resources):
+    user_index = build_index(users)
+    resource_index = build_index(resources)
+    matches = {}
+    for key, rule in zip(rule_keys(rules), rules):
+        matches[key] = {(users[ui]['uid'], resources[ri]['rid'])
+                        for ui, ri in match_rule(rule, users, resources, user_index, resource_index)}
+    return matches
+
+
+# Function to find the changed entities between two versions, as the ids that were added, removed or modified
+def changed_entities(previous, current):
+    changed = {key for key, entity in current.items() if previous.get(key) != entity}
+    return changed | (previous.keys() - current.keys())
+
+
+# Function to re-evaluate a policy against the cache of the previous version
+# unchanged rules are only matched against the changed users and resources, changed rules against everything
+# the cache is updated in place, the result is the new output and the delta {(uid, rid): (old, new)}
+def evaluate_incremental(rules, users, resources, cache):
+    current_users = {user['uid']: user for user in users}
+    current_resources = {resource['rid']: resource for resource in resources}
+    current_rules = dict(zip(rule_keys(rules), rules))
+    changed_users = changed_entities(cache['users'], current_users)
+    changed_resources = changed_entities(cache['resources'], current_resources)
+    changed_rules = changed_entities(cache['rules'], current_rules)
+
+    user_positions = [i for i, user in enumerate(users) if user['uid'] in changed_users]
+    resource_positions = [i for i, resource in enumerate(resources) if resource['rid'] in changed_resources]
+    indexes = {}
+    affected = set()
+    matches = {}
+    for key, rule in current_rules.items():
+        if key in changed_rules:
+            runs = [(None, None)]
+            previous = set()
+        else:
+            runs = [(user_positions, None), (None, resource_positions)]
+            previous = {pair for pair in cache['matches'][key]
+                        if pair[0] not in changed_users and pair[1] not in changed_resources}
+        matched = set(previous)
+        for restricted_users, restricted_resources in runs:
+            if restricted_users == [] or restricted_resources == []:
+                continue
+            if not indexes:
+                indexes.update(user=build_index(users), resource=build_index(resources))
+            for ui, ri in match_rule(rule, users, resources, indexes['user'], indexes['resource'],
+                                     restricted_users, restricted_resources):
+                matched.add((users[ui]['uid'], resources[ri]['rid']))
+        affected |= matched ^ cache['matches'].get(key, set())
+        matches[key] = matched
+    for key in cache['matches'].keys() - current_rules.keys():
+        affected |= cache['matches'][key]
+
+    output = cache['output']
+    delta = {}
+    for pair in affected:
+        operations = set()
+        for key, rule in current_rules.items():
+            if pair in matches[key]:
+                operations.update(rule['operations'])
+        previous = output.pop(pair, set())
+        if operations:
+            output[pair] = operations
+        if operations != previous:
+            delta[pair] = (previous, operations)
+    cache.update(users=current_users, resources=current_resources, rules=current_rules, matches=matches)
+    return output, delta
+
+
+# Function to load the cache of the incremental mode, an empty cache forces a full evaluation
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return {'users': {}, 'resources': {}, 'rules': {}, 'matches': {}, 'output': {}}
+
+
+def save_cache(cache_path, cache):
+    with open(cache_path, 'wb') as file:
+        pickle.dump(cache, file, pickle.HIGHEST_PROTOCOL)
+
+
+# Function to write the delta of the incremental mode
+# the first line is a dictionary {(uid,rid):{operations}} of the added or extended authorizations
+# the second line is a dictionary {(uid,rid):{operations}} of the removed or reduced authorizations
+def write_delta(file_path, delta):
+    added = {pair: new - old for pair, (old, new) in delta.items() if new - old}
+    removed = {pair: old - new for pair, (old, new) in delta.items() if old - new}
+    with open(file_path, 'w') as file:
+        file.write(str(added) + '\n')
+        file.write(str(removed))
+
+
+# Function to write the authorizations in the legacy text format
+# the first line is the list of users (uid)
+# the second line is the list of resources (rid)
+# the third line is a dictionary of the form {(uid,rid):{operations}} it's corresponding of the authorization user/resource/operation
+def write_text(file_path, users, resources, output):
+    with open(file_path, 'w') as file:
+        file.write(str(users) + '\n')
+        file.write(str(resources) + '\n')
+        file.write(str(output))
+
+
+BINARY_MAGIC = b'ABACAUTH'
+BINARY_VERSION = 1
+# version, number of users, resources, operations and pairs
+BINARY_HEADER = struct.Struct('<IIIIQ')
+
+
+# Function to write an array in little endian, padded to 8 bytes
+def _write_array(file, values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    data = values.tobytes()
+    file.write(data)
+    file.write(b'\0' * (-len(data) % 8))
+
+
+# Function to write an interned string table, uint32 byte offsets followed by the utf-8 blob
+def _write_strings(file, strings):
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = array('I', [0])
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+    _write_array(file, offsets)
+    blob = b''.join(encoded)
+    file.write(blob)
+    file.write(b'\0' * (-len(blob) % 8))
+
+
+# Function to write the authorizations in the binary format
+# header, string tables of the uids, rids and operations, then the pairs sorted by user and resource:
+# uint64 offset of the first pair of every user, uint32 user and resource columns and a uint64 operation bitmask
+def write_binary(file_path, users, resources, output):
+    operations = sorted({operation for operations in output.values() for operation in operations})
+    if len(operations) > 64:
+        print("Error: the binary format supports up to 64 operations")
+        exit(1)
+    users = list(users) + sorted({uid for uid, _ in output} - set(users))
+    resources = list(resources) + sorted({rid for _, rid in output} - set(resources))
+    user_ids = {uid: i for i, uid in enumerate(users)}
+    resource_ids = {rid: i for i, rid in enumerate(resources)}
+    bits = {operation: 1 << i for i, operation in enumerate(operations)}
+
+    pairs = sorted((user_ids[uid], resource_ids[rid], sum(bits[operation] for operation in granted))
+                   for (uid, rid), granted in output.items())
+    user_column = array('I', (pair[0] for pair in pairs))
+    resource_column = array('I', (pair[1] for pair in pairs))
+    masks = array('Q', (pair[2] for pair in pairs))
+    user_offsets = array('Q', [0] * (len(users) + 1))
+    for ui in user_column:
+        user_offsets[ui + 1] += 1
+    for i in range(len(users)):
+        user_offsets[i + 1] += user_offsets[i]
+
+    with open(file_path, 'wb') as file:
+        file.write(BINARY_MAGIC)
+        file.write(BINARY_HEADER.pack(BINARY_VERSION, len(users), len(resources), len(operations), len(pairs)))
+        _write_strings(file, users)
+        _write_strings(file, resources)
+        _write_strings(file, operations)
+        _write_array(file, user_offsets)
+        _write_array(file, user_column)
+        _write_array(file, resource_column)
+        _write_array(file, masks)
+
+
+WRITERS = {'text': write_text, 'binary': write_binary}
+
+
+# Function to generate data to the visualisation
+# the data is saved in abac_res.txt with the text format or abac_res.bin with the binary format
+# with workers > 1 the rules are evaluated by the indexed engine in a process pool
+# with a cache_path only the pairs affected by the changes since the cached version are evaluated
+# and the delta is written next to the output
+def gen_data(file_path, engine='indexed', workers=1, output_format='text', output_path=None, cache_path=None):
+    users, resources, rules = parse_policy(file_path)
+    delta = None
+    # the hit rate of a rule is its number of hits over the user x resource pairs
+    profiling.count("user x resource pairs", len(users) * len(resources))
+    with profiling.span("evaluate_rules", engine='incremental' if cache_path is not None else engine, workers=workers):
+        if cache_path is not None:
+            cache = load_cache(cache_path)
+            output, delta = evaluate_incremental(rules, users, resources, cache)
+            save_cache(cache_path, cache)
+        elif workers > 1:
+            output = evaluate_rules_parallel(rules, users, resources, workers)
+        else:
+            output = ENGINES[engine](rules, users, resources)
+    profiling.count("authorized pairs", len(output))
     users_ = [i['uid'] for i in users]
     resources_ = [i['rid'] for i in resources]
-    with open('abac_res.txt', 'w') as file:
-        file.write(str(users_) + '\n')
-        file.write(str(resources_) + '\n')
-        file.write(str(output))
+    if output_path is None:
+        output_path = 'abac_res.bin' if output_format == 'binary' else 'abac_res.txt'
+    with profiling.span("write_authorizations", format=output_format):
+        WRITERS[output_format](output_path, users_, resources_, output)
+    if delta is not None:
+        write_delta(os.path.splitext(output_path)[0] + '_delta.txt', delta)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python3 abac_reader.py <file>")
-        exit(1)
-    gen_data(sys.argv[1])
+    parser = argparse.ArgumentParser(description="ABAC policy reader")
+    parser.add_argument("file", type=str, help="Path to the .abac policy file")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default='indexed',
+                        help="Rule evaluation engine, nested is the original user x resource loop")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes evaluating the rules with the indexed engine")
+    parser.add_argument("--format", choices=sorted(WRITERS), default='text',
+                        help="Output format, text is the legacy format read with ast.literal_eval")
+    parser.add_argument("-o", "--output", type=str,
+                        help="Output file, abac_res.txt or abac_res.bin by default")
+    parser.add_argument("--cache", type=str,
+                        help="Cache file of the incremental mode, only the changes since the cached policy are evaluated")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start_from_arguments(args)
+    gen_data(args.file, args.engine, args.workers, args.format, args.output, args.cache)
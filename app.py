@@ -0,0 +1,591 @@
+import time
+from collections import Counter
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PyQt5.QtCore import QObject, QRunnable, QThread, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit, QPushButton, QProgressBar,
+                             QSlider)
+
+import profiling
+from layout import LayoutCache
+from query import QueryIndex
+from render import RESOURCE_COLOR, USER_COLOR, draw_view, select_view
+from visualizer import (FOLLOW_POLL, TRIPLE_PATTERN, GraphIndex, LogTail, build_view_data, format_time,
+                        load_data)
+
+# lines of the profiling overlay, the slowest stages and then the counters
+STATS_LINES = 24
+FILTER_HELP = ("operation: predicate on the resources, in the syntax of the rules, e.g. read: type in {task}\n"
+               "keeps the users allowed the operation on a matching resource and the matching resources")
+
+
+# Worker object loading the data in a QThread, the window stays responsive and shows the partial results
+# with args.follow it then polls the log files and emits the counts of the appended entries
+class Loader(QObject):
+    progress = pyqtSignal(int, str)
+    partial = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    appended = pyqtSignal(object)
+
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        self.cancelled = False
+
+    def report(self, percent, message):
+        # the loading stops at the next block once the window is closed
+        if self.cancelled:
+            raise InterruptedError
+        self.progress.emit(percent, message)
+
+    def run(self):
+        tails = None
+        if self.args.follow:
+            # compressed logs are not appended to, they are only read once
+            tails = {file_path: LogTail(file_path) for file_path in self.args.log_file
+                     if not file_path.endswith(('.gz', '.zst'))}
+        try:
+            self.finished.emit(load_data(self.args, self.report, self.partial.emit, tails))
+            if tails:
+                self.follow(tails)
+        except InterruptedError:
+            pass
+        except SystemExit:
+            # the loaders print their error before exiting
+            self.failed.emit("Loading failed, see the console")
+        except Exception as error:
+            print(f"Error: {error}")
+            self.failed.emit(f"Loading failed: {error}")
+        finally:
+            for tail in (tails or {}).values():
+                tail.close()
+
+    # Poll the followed log files until the window is closed, the new entries are counted here and the window
+    # merges them at its own refresh rate
+    def follow(self, tails):
+        while not self.cancelled:
+            counts = Counter()
+            for tail in tails.values():
+                for block in tail.read_blocks():
+                    triples = TRIPLE_PATTERN.findall(block)
+                    profiling.count("followed rows parsed", len(triples))
+                    counts.update(triples)
+            if counts:
+                self.appended.emit(counts)
+            time.sleep(FOLLOW_POLL)
+
+
+# Signals of the layout and time window tasks, a QRunnable cannot emit them itself
+class TaskSignals(QObject):
+    done = pyqtSignal(object)
+
+
+# Layout of a view computed on a thread pool
+# a task whose generation is older than the latest request of the window is dropped before it starts
+class LayoutTask(QRunnable):
+    def __init__(self, app, generation, key, view, previous):
+        super().__init__()
+        self.app = app
+        self.generation = generation
+        self.key = key  # (view, selected node, graph version) of the layout cache
+        self.view = view
+        self.previous = previous
+        self.positions = None
+        self.signals = TaskSignals()
+
+    def run(self):
+        if self.generation == self.app.generation:
+            with profiling.span("layout", view=self.key[0], nodes=len(self.view['neighbors']) + 1):
+                self.positions = self.app.layouts.layout(self.view['center'], self.view['neighbors'], self.previous)
+        self.signals.done.emit(self)
+
+
+# Data of the views for the buckets since to until of the time index, counted and indexed on a thread pool
+# a task whose generation is older than the latest position of the sliders is dropped before it starts
+class WindowTask(QRunnable):
+    def __init__(self, app, generation, since, until):
+        super().__init__()
+        self.app = app
+        self.generation = generation
+        self.since = since
+        self.until = until
+        self.args = (app.time_index, app.users, app.resources, app.authorizations,
+                     (app.user_attributes, app.resource_attributes))
+        self.data = None
+        self.signals = TaskSignals()
+
+    def run(self):
+        if self.generation == self.app.window_generation:
+            time_index, users, resources, authorizations, attributes = self.args
+            with profiling.span("time_window", buckets=self.until - self.since + 1):
+                operation_counts = time_index.counts_between(self.since, self.until)
+                self.data = build_view_data(operation_counts, users, resources, authorizations, attributes,
+                                            time_index, (self.since, self.until))
+        self.signals.done.emit(self)
+
+
+# PyQt5 Application for visualizing data
+class App(QWidget):
+    def __init__(self, graph, users, resources, authorizations, operation_colors, operation_counts, layout="radial",
+                 attributes=None, cluster_attribute="project"):
+        super().__init__()
+        self.canvas = None
+        self.switch_button = None
+        self.resource_combo = None
+        self.resource_label = None
+        self.user_combo = None
+        self.user_label = None
+        self.progress_bar = None
+        self.stats_label = None
+        self.user_color = USER_COLOR
+        self.resource_color = RESOURCE_COLOR
+        self.users = users
+        self.resources = resources
+        self.G = graph
+        self.authorizations = authorizations
+        self.operation_colors = operation_colors
+        self.operation_counts = operation_counts  # Store the operation counts
+        self.show_users = True  # Initialize to show user view
+        self.layouts = LayoutCache(layout)
+        self.graph_version = 0  # Incremented when the graph changes, to invalidate the cached layouts
+        # Attributes of the users and resources from the .abac policy, used to group the neighbours of large views
+        self.user_attributes, self.resource_attributes = attributes or ({}, {})
+        self.cluster_attribute = cluster_attribute
+        self.drill = None  # (view, selected node, group) shown instead of the groups
+        self.view_key = None
+        self.view_nodes = []
+        self.view_clusters = False
+        self.center_points = None
+        # Layouts are computed off the GUI thread, every view request gets a new generation and older ones are dropped
+        self.generation = 0
+        self.layout_pool = QThreadPool()
+        self.layout_pool.setMaxThreadCount(1)
+        self.layout_tasks = set()
+        self.loader = None
+        self.loader_thread = None
+        # Entries appended to the followed logs, merged and drawn at most once per refresh
+        self.pending = Counter()
+        self.refresh_timer = None
+        self.user_items = set(users)  # items of the combo boxes
+        self.resource_items = set(resources)
+        # Time index of the entries, the sliders select the buckets counted by the views
+        self.time_index = None
+        self.time_timer = None
+        # the views of a new time window are built off the GUI thread, like the layouts
+        self.window_generation = 0
+        self.window_pool = QThreadPool()
+        self.window_pool.setMaxThreadCount(1)
+        self.window_tasks = set()
+        self.time_widget = None
+        self.since_slider = None
+        self.until_slider = None
+        self.time_label = None
+        # Filter box, the combo boxes only list the users and resources of the query, None when there is no filter
+        self.filter_edit = None
+        self.query_index = None  # built from the authorizations and attributes on the first filter
+        self.filter_users = None
+        self.filter_resources = None
+        self.init_ui()
+        self.update_ui()
+
+    def init_ui(self):
+        self.setWindowTitle("Log Viewer")
+        self.setGeometry(100, 100, 800, 600)
+
+        # Create layouts
+        main_layout = QVBoxLayout()
+        user_layout = QHBoxLayout()
+        resource_layout = QHBoxLayout()
+        switch_layout = QHBoxLayout()
+        filter_layout = QHBoxLayout()
+
+        # Filter of the users and resources by query
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("read: type in {task}, project in {proj1}")
+        self.filter_edit.setToolTip(FILTER_HELP)
+        filter_layout.addWidget(QLabel("Filter:"))
+        filter_layout.addWidget(self.filter_edit)
+
+        # User selection
+        self.user_label = QLabel("User:")
+        self.user_combo = QComboBox()
+        self.user_combo.addItems(self.users)
+        user_layout.addWidget(self.user_label)
+        user_layout.addWidget(self.user_combo)
+
+        # Resource selection
+        self.resource_label = QLabel("Resource:")
+        self.resource_combo = QComboBox()
+        self.resource_combo.addItems(self.resources)
+        resource_layout.addWidget(self.resource_label)
+        resource_layout.addWidget(self.resource_combo)
+
+        # Switch button
+        self.switch_button = QPushButton("Switch to Resources" if self.show_users else "Switch to Users")
+        switch_layout.addWidget(self.switch_button)
+
+        # Loading progress, hidden when nothing is loading
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+
+        # Time range, shown when the logs are indexed by time
+        time_layout = QHBoxLayout()
+        self.since_slider = QSlider(Qt.Horizontal)
+        self.until_slider = QSlider(Qt.Horizontal)
+        self.time_label = QLabel()
+        time_layout.addWidget(QLabel("From:"))
+        time_layout.addWidget(self.since_slider)
+        time_layout.addWidget(QLabel("To:"))
+        time_layout.addWidget(self.until_slider)
+        time_layout.addWidget(self.time_label)
+        self.time_widget = QWidget()
+        self.time_widget.setLayout(time_layout)
+        self.time_widget.setVisible(False)
+        # the window is counted again once the sliders stop moving
+        self.time_timer = QTimer(self)
+        self.time_timer.setSingleShot(True)
+        self.time_timer.setInterval(150)
+
+        # Add layouts to the main layout
+        main_layout.addLayout(filter_layout)
+        main_layout.addLayout(user_layout)
+        main_layout.addLayout(resource_layout)
+        main_layout.addLayout(switch_layout)
+        main_layout.addWidget(self.progress_bar)
+        main_layout.addWidget(self.time_widget)
+
+        # Create a canvas for graph visualization
+        self.canvas = FigureCanvas(Figure())
+        main_layout.addWidget(self.canvas)
+
+        # Timings and counters of the stages over the canvas, with --profile
+        self.stats_label = QLabel(self.canvas)
+        self.stats_label.setStyleSheet("background: rgba(255, 255, 255, 200); color: black; font-family: monospace; "
+                                       "font-size: 9pt; padding: 4px;")
+        self.stats_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.stats_label.move(4, 4)
+        self.stats_label.setVisible(profiling.enabled())
+
+        # Connect signals to slots
+        self.user_combo.currentIndexChanged.connect(self.update_ui)
+        self.resource_combo.currentIndexChanged.connect(self.update_ui)
+        self.switch_button.clicked.connect(self.toggle_view)
+        self.filter_edit.returnPressed.connect(self.apply_filter)
+        self.canvas.mpl_connect("pick_event", self.on_pick)
+        self.since_slider.valueChanged.connect(self.on_time_changed)
+        self.until_slider.valueChanged.connect(self.on_time_changed)
+        self.time_timer.timeout.connect(self.apply_time_window)
+
+        # Set the main layout
+        self.setLayout(main_layout)
+
+    # Load the data of the command line arguments in a background thread, the views are updated with partial results
+    def start_loading(self, args):
+        self.loader_thread = QThread()
+        self.loader = Loader(args)
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.progress.connect(self.on_progress)
+        self.loader.partial.connect(self.set_data)
+        self.loader.finished.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.finished.connect(self.loader_thread.quit)
+        self.loader.failed.connect(self.loader_thread.quit)
+        self.progress_bar.setVisible(True)
+        if args.follow:
+            self.loader.appended.connect(self.on_appended)
+            self.refresh_timer = QTimer(self)
+            self.refresh_timer.timeout.connect(self.apply_pending)
+            self.refresh_timer.start(int(args.refresh * 1000))
+        self.loader_thread.start()
+
+    def on_progress(self, percent, message):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"{message} %p%")
+
+    def on_loaded(self, data):
+        self.progress_bar.setVisible(False)
+        self.set_data(data)
+        self.update_stats()
+
+    def on_load_failed(self, message):
+        self.progress_bar.setFormat(message)
+
+    # Stop the loader at its next block and drop the queued layouts, before the window or the application closes
+    def stop_loading(self):
+        if self.loader_thread is not None and self.loader_thread.isRunning():
+            self.loader.cancelled = True
+            self.loader_thread.quit()
+            self.loader_thread.wait()
+        self.generation += 1
+        self.window_generation += 1
+        self.layout_pool.waitForDone()
+        self.window_pool.waitForDone()
+
+    def closeEvent(self, event):
+        self.stop_loading()
+        super().closeEvent(event)
+
+    def on_appended(self, counts):
+        self.pending.update(counts)
+
+    # Merge the entries appended to the followed logs since the last refresh
+    # the new users and resources are appended to the combo boxes and the view is only drawn again if it changed
+    def apply_pending(self):
+        if not self.pending:
+            return
+        counts, self.pending = self.pending, Counter()
+        with profiling.span("merge_followed", triples=len(counts)):
+            if self.G.add_counts(counts, self.authorizations):
+                self.graph_version += 1
+            # the overlays are folded into the CSR arrays once they hold a quarter of the edges
+            if self.G.overlay_size > max(1024, len(self.G.labels) // 4):
+                self.G = GraphIndex(self.G.operations, self.G.operation_counts)
+        self.operation_counts = self.G.operation_counts
+        users = {user for user, _, _ in counts}
+        resources = {resource for _, resource, _ in counts}
+        new_users = sorted(users - self.user_items)
+        new_resources = sorted(resources - self.resource_items)
+        if new_users:
+            self.users = self.users + new_users
+            self.user_items.update(new_users)
+            self.user_combo.addItems(self.filter_items(new_users, self.filter_users))
+        if new_resources:
+            self.resources = self.resources + new_resources
+            self.resource_items.update(new_resources)
+            self.resource_combo.addItems(self.filter_items(new_resources, self.filter_resources))
+        if self.show_users:
+            changed = self.user_combo.currentText() in users
+        else:
+            changed = self.resource_combo.currentText() in resources
+        if changed:
+            self.update_ui()
+
+    # Fill a combo box with new items, keeping the selected one
+    def set_items(self, combo, items):
+        selected = combo.currentText()
+        combo.blockSignals(True)
+        combo.clear()
+        combo.addItems(items)
+        index = combo.findText(selected)
+        if index >= 0:
+            combo.setCurrentIndex(index)
+        combo.blockSignals(False)
+
+    # Items of a combo box kept by the filter, all of them without filter
+    @staticmethod
+    def filter_items(items, allowed):
+        return items if allowed is None else [item for item in items if item in allowed]
+
+    # Compute the users and resources of the filter box, "operation: predicate", "operation:" or "predicate"
+    # e.g. "read: type in {task}" keeps the users allowed to read a task and the tasks that some user may read
+    # an invalid filter is shown in red with the error in its tooltip and does not filter anything
+    def compute_filter(self):
+        self.filter_users = self.filter_resources = None
+        self.filter_edit.setToolTip(FILTER_HELP)
+        self.filter_edit.setStyleSheet("")
+        text = self.filter_edit.text().strip()
+        if not text:
+            return
+        operation, predicate = text.split(':', 1) if ':' in text else ("", text)
+        operation = operation.strip() or None
+        if self.query_index is None:
+            self.query_index = QueryIndex(self.users, self.resources, self.authorizations,
+                                          (self.user_attributes, self.resource_attributes))
+        try:
+            with profiling.span("filter"):
+                self.filter_users = set(self.query_index.who_can(operation, predicate))
+                self.filter_resources = set(self.query_index.resources_where(predicate, operation))
+        except ValueError as error:
+            self.filter_edit.setToolTip(f"Error: {error}")
+            self.filter_edit.setStyleSheet("background: #FFD0D0;")
+
+    def apply_filter(self):
+        self.compute_filter()
+        self.set_items(self.user_combo, self.filter_items(self.users, self.filter_users))
+        self.set_items(self.resource_combo, self.filter_items(self.resources, self.filter_resources))
+        self.update_ui()
+
+    # Replace the data of the views, e.g. with the partial or final results of the loader
+    def set_data(self, data):
+        user_attributes, resource_attributes = data['attributes'] or ({}, {})
+        if data['authorizations'] is not self.authorizations or user_attributes is not self.user_attributes:
+            # the query index is built again on the next filter, the current filter is applied to the new data
+            self.query_index = None
+            refilter = bool(self.filter_edit.text().strip())
+        else:
+            refilter = False
+        new_users = data['users'] is not self.users
+        new_resources = data['resources'] is not self.resources
+        self.users = data['users']
+        self.resources = data['resources']
+        self.authorizations = data['authorizations']
+        self.user_attributes, self.resource_attributes = user_attributes, resource_attributes
+        if refilter:
+            self.compute_filter()
+        if new_users or refilter:
+            self.set_items(self.user_combo, self.filter_items(data['users'], self.filter_users))
+            self.user_items = set(data['users'])
+        if new_resources or refilter:
+            self.set_items(self.resource_combo, self.filter_items(data['resources'], self.filter_resources))
+            self.resource_items = set(data['resources'])
+        self.G = data['graph']
+        self.operation_colors = data['operation_colors']
+        self.operation_counts = data['operation_counts']
+        if data['time_index'] is not None and data['time_index'] is not self.time_index:
+            self.set_time_index(data['time_index'], data['time_window'])
+        self.graph_version += 1
+        self.update_ui()
+
+    # Show the time sliders over the buckets of the index, positioned on the counted window
+    def set_time_index(self, time_index, time_window):
+        self.time_index = time_index
+        bucket_range = time_index.bucket_range()
+        if bucket_range is None:
+            return
+        for slider, value in ((self.since_slider, time_window[0]), (self.until_slider, time_window[1])):
+            slider.blockSignals(True)
+            slider.setRange(*bucket_range)
+            slider.setValue(value)
+            slider.blockSignals(False)
+        self.update_time_label()
+        self.time_widget.setVisible(True)
+
+    def update_time_label(self):
+        width = self.time_index.width
+        self.time_label.setText(f"{format_time(self.since_slider.value() * width)} - "
+                                f"{format_time((self.until_slider.value() + 1) * width)}")
+
+    def on_time_changed(self):
+        # the sliders cannot cross, the one that moved pushes the other
+        if self.since_slider.value() > self.until_slider.value():
+            if self.sender() is self.since_slider:
+                self.until_slider.setValue(self.since_slider.value())
+            else:
+                self.since_slider.setValue(self.until_slider.value())
+        self.update_time_label()
+        self.time_timer.start()
+
+    # Count the entries of the selected buckets with the prefix sums of the time index and rebuild the views,
+    # on the window pool so that the sliders stay responsive
+    def apply_time_window(self):
+        self.window_generation += 1
+        task = WindowTask(self, self.window_generation, self.since_slider.value(), self.until_slider.value())
+        task.signals.done.connect(self.on_window_done)
+        self.window_tasks.add(task)
+        self.window_pool.start(task)
+
+    def on_window_done(self, task):
+        self.window_tasks.discard(task)
+        # the sliders moved again meanwhile, the task of their latest position is queued
+        if task.data is not None and task.generation == self.window_generation:
+            self.set_data(task.data)
+
+    def toggle_view(self):
+        self.show_users = not self.show_users
+        self.switch_button.setText("Switch to Resources" if self.show_users else "Switch to Users")
+        self.update_ui()
+
+    # Select the neighbours of the view, grouped by attribute for high-degree nodes, None without a selected node
+    def select_view(self):
+        if self.show_users:
+            # View showing all resources connected to the selected user
+            view_name, center = "users", self.user_combo.currentText()
+            center_color, neighbor_color, attributes = self.user_color, self.resource_color, self.resource_attributes
+        else:
+            # View showing all users connected to the selected resource
+            view_name, center = "resources", self.resource_combo.currentText()
+            center_color, neighbor_color, attributes = self.resource_color, self.user_color, self.user_attributes
+        if not center:
+            return None
+        drill = self.drill[2] if self.drill is not None and self.drill[:2] == (view_name, center) else None
+        selected = select_view(self.G, view_name, center, attributes, self.cluster_attribute, drill)
+        if selected is not None:
+            selected.update(key=(view_name, center), center_color=center_color, neighbor_color=neighbor_color)
+        return selected
+
+    def update_ui(self):
+        self.user_label.setVisible(self.show_users)
+        self.user_combo.setVisible(self.show_users)
+        self.resource_label.setVisible(not self.show_users)
+        self.resource_combo.setVisible(not self.show_users)
+
+        # A new request, the layouts still queued for the previous ones are dropped
+        self.generation += 1
+        with profiling.span("select_view"):
+            view = self.select_view()
+        if view is None:
+            self.draw(None, None)
+            return
+        # Positions of the view, cached by view, selected node and graph version
+        key = (view['name'], view['center'], self.graph_version)
+        positions = self.layouts.lookup(*key)
+        if positions is not None:
+            self.draw(view, positions)
+            return
+        # Otherwise the layout is computed on the pool and the current drawing stays until it is done
+        task = LayoutTask(self, self.generation, key, view, self.layouts.previous(*key[:2]))
+        task.signals.done.connect(self.on_layout_done)
+        self.layout_tasks.add(task)
+        self.layout_pool.start(task)
+
+    def on_layout_done(self, task):
+        self.layout_tasks.discard(task)
+        if task.positions is None:
+            return
+        # a finished layout is cached even when the view changed meanwhile, it is only drawn if it is the latest one
+        self.layouts.put(*task.key, task.positions)
+        if task.generation == self.generation:
+            self.draw(task.view, task.positions)
+
+    def draw(self, view, positions):
+        with profiling.span("draw", nodes=len(view['neighbors']) + 1 if view is not None else 0):
+            self.draw_figure(view, positions)
+        self.update_stats()
+
+    def draw_figure(self, view, positions):
+        # Clear the previous graph and draw the new view with operations
+        figure = self.canvas.figure
+        figure.clf()
+        ax = figure.add_subplot()
+        self.view_key = None
+        self.view_nodes = []
+        self.view_clusters = False
+        self.center_points = None
+
+        if view is not None:
+            self.view_key = view['key']
+            self.view_nodes = view['neighbors']
+            self.view_clusters = view['clusters']
+            _, self.center_points = draw_view(ax, view['center'], view['neighbors'], view['labels'], positions,
+                                              view['center_color'], view['neighbor_color'], view['sizes'],
+                                              view['label_degree'])
+        else:
+            ax.set_axis_off()
+
+        ax.set_title("ABAC Log Visualization")
+
+        # Draw the graph on the canvas
+        self.canvas.draw()
+
+    # Show the totals of the profiler over the canvas
+    def update_stats(self):
+        if self.stats_label.isHidden():
+            return
+        self.stats_label.setText("\n".join(profiling.summary()[:STATS_LINES]))
+        self.stats_label.adjustSize()
+        self.stats_label.raise_()
+
+    # Click on a group of neighbours to show its members, click on the selected node to go back to the groups
+    def on_pick(self, event):
+        if event.artist is self.center_points:
+            if self.drill is None:
+                return
+            self.drill = None
+        elif self.view_clusters:
+            self.drill = self.view_key + (self.view_nodes[event.ind[0]],)
+        else:
+            return
+        self.update_ui()
@@ -0,0 +1,132 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import abac_reader
+
+
+# Function to write a synthetic policy scaled up from project-management.abac
+# every department has `projects` projects, every project has its designers, coders and leader
+# and `tasks` groups of the 8 tasks of the original policy
+def write_policy(file, departments, projects, tasks):
+    for d in range(1, departments + 1):
+        names = [f"proj{d}{p}" for p in range(1, projects + 1)]
+        project_set = "{" + " ".join(names) + "}"
+        file.write(f"userAttrib(acc{d}, adminRoles={{accountant}}, projects={project_set})\n")
+        file.write(f"userAttrib(aud{d}, adminRoles={{auditor}}, projects={project_set})\n")
+        file.write(f"userAttrib(plan{d}, adminRoles={{planner}}, projects={project_set})\n")
+        file.write(f"userAttrib(mgr{d}, adminRoles={{manager}}, department=dept{d})\n")
+        for index, project in enumerate(names):
+            employee = "True_" if index % 2 == 0 else "False_"
+            file.write(f"userAttrib(ldr{project}, projects={{{project}}}, projectsLed={{{project}}}, department=dept{d})\n")
+            for kind, expertise in ((1, 'design'), (2, 'coding')):
+                for t in range(tasks):
+                    assigned = f"{project}task{kind}a{t} {project}task{kind}propa{t}"
+                    file.write(f"userAttrib(w{kind}{project}x{t}, expertise={{{expertise}}}, projects={{{project}}}, "
+                               f"isEmployee={employee}, tasks={{{assigned}}})\n")
+            file.write(f"resourceAttrib({project}budget, type=budget, project={project}, department=dept{d})\n")
+            file.write(f"resourceAttrib({project}sched, type=schedule, project={project}, department=dept{d})\n")
+            for t in range(tasks):
+                for kind, expertise in ((1, 'design'), (2, 'coding')):
+                    for suffix, proprietary in (('a', 'false'), ('', 'false'), ('propa', 'true'), ('prop', 'true')):
+                        file.write(f"resourceAttrib({project}task{kind}{suffix}{t}, type=task, project={project}, "
+                                   f"department=dept{d}, expertise={{{expertise}}}, proprietary={proprietary})\n")
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'project-management.abac')) as policy:
+        for line in policy:
+            if line.startswith('rule'):
+                file.write(line)
+
+
+# Function to write a small random policy mixing scalar, set and missing values of the same attributes,
+# with rules using every attribute value and attribute attribute operator on them
+def write_random_policy(file, rng, users=12, resources=12, rules=4):
+    names, tokens = ('a', 'b', 'c'), ('x', 'y', 'z')
+
+    def value():
+        if rng.random() < 0.5:
+            return rng.choice(tokens)
+        return "{" + " ".join(rng.sample(tokens, rng.randint(0, 2))) + "}"
+
+    def entity(kind, key):
+        attributes = [f"{name}={value()}" for name in names if rng.random() < 0.8]
+        return f"{kind}({', '.join([key] + attributes)})\n"
+
+    def conditions():
+        chosen = []
+        for name in rng.sample(names, rng.randint(0, 2)):
+            if rng.random() < 0.5:
+                chosen.append(f"{name} in {{{' '.join(rng.sample(tokens, rng.randint(1, 2)))}}}")
+            else:
+                alternatives = ["{" + " ".join(rng.sample(tokens, rng.randint(0, 2))) + "}"
+                                for _ in range(rng.randint(1, 2))]
+                chosen.append(f"{name} supseteqln {{{' '.join(alternatives)}}}")
+        return ", ".join(chosen)
+
+    for i in range(users):
+        file.write(entity("userAttrib", f"u{i}"))
+    for i in range(resources):
+        file.write(entity("resourceAttrib", f"r{i}"))
+    for i in range(rules):
+        pairs = [f"{rng.choice(names)} {rng.choice('=]<>')} {rng.choice(names)}" for _ in range(rng.randint(0, 2))]
+        file.write(f"rule(rule{i}; {conditions()}; {conditions()}; {{read}}; {', '.join(pairs)})\n")
+
+
+# Function to compare the indexed engine with the nested one on random policies, returns the mismatching seeds
+def check_engines(policies, seed=0):
+    mismatches = []
+    for case in range(seed, seed + policies):
+        with tempfile.NamedTemporaryFile('w', suffix='.abac', delete=False) as file:
+            write_random_policy(file, random.Random(case))
+        try:
+            users, resources, rules = abac_reader.parse_policy(file.name)
+        finally:
+            os.remove(file.name)
+        if abac_reader.evaluate_rules_indexed(rules, users, resources) != \
+                abac_reader.evaluate_rules(rules, users, resources):
+            mismatches.append(case)
+    return mismatches
+
+
+# Function to time a rule evaluation engine
+def time_engine(engine, rules, users, resources):
+    start = time.perf_counter()
+    output = engine(rules, users, resources)
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the rule evaluation engines of abac_reader")
+    parser.add_argument("--scales", nargs='+', type=int, default=[1, 2, 4, 8, 16],
+                        help="Scale factors, each one multiplies the departments, projects and tasks")
+    parser.add_argument("--max-nested-pairs", type=int, default=5 * 10 ** 7,
+                        help="Skip the nested engine when rules x users x resources is above this value")
+    parser.add_argument("--check", type=int, default=300,
+                        help="Random policies with scalar and set values on which the engines are compared first")
+    args = parser.parse_args()
+
+    mismatches = check_engines(args.check)
+    print(f"indexed and nested engines on {args.check} random policies: {len(mismatches)} mismatches"
+          + (f", seeds {mismatches[:10]}" if mismatches else ""))
+
+    print(f"{'scale':>5} {'users':>8} {'resources':>10} {'pairs':>9} {'nested (s)':>11} {'indexed (s)':>12} {'speedup':>8} {'same':>5}")
+    for scale in args.scales:
+        with tempfile.NamedTemporaryFile('w', suffix='.abac', delete=False) as file:
+            write_policy(file, 2 * scale, 2 * scale, scale)
+        try:
+            users, resources, rules = abac_reader.parse_policy(file.name)
+        finally:
+            os.remove(file.name)
+        indexed, output = time_engine(abac_reader.evaluate_rules_indexed, rules, users, resources)
+        if len(rules) * len(users) * len(resources) <= args.max_nested_pairs:
+            nested, expected = time_engine(abac_reader.evaluate_rules, rules, users, resources)
+            nested_text, speedup, same = f"{nested:.3f}", f"{nested / indexed:.1f}x", str(output == expected)
+        else:
+            nested_text, speedup, same = "skipped", "-", "-"
+        print(f"{scale:>5} {len(users):>8} {len(resources):>10} {len(output):>9} {nested_text:>11} {indexed:>12.3f} "
+              f"{speedup:>8} {same:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import abac_reader
+from benchmark_gen_data import write_policy
+
+
+# Function to scan a policy the way gen_data used to, readlines and three regexes per line
+def legacy_scan(file_path):
+    with open(file_path, 'r') as file:
+        lines = file.readlines()
+    records = 0
+    for line in lines:
+        records += len(re.findall(r'rule\s*\((.*?)\)', line))
+        records += len(re.findall(r'userAttrib\s*\((.*?)\)', line))
+        records += len(re.findall(r'resourceAttrib\s*\((.*?)\)', line))
+    return records
+
+
+# Function to parse a policy with the streaming parser without keeping the records
+def streaming_scan(file_path):
+    records = 0
+    with open(file_path, 'r', buffering=1 << 20) as file:
+        for _ in abac_reader.iter_policy(file):
+            records += 1
+    return records
+
+
+# Function to only classify the lines of a policy with the precompiled pattern
+def tokenize_scan(file_path):
+    records = 0
+    with open(file_path, 'r', buffering=1 << 20) as file:
+        for line in file:
+            if line[0] != '#' and abac_reader.POLICY_LINE.match(line):
+                records += 1
+    return records
+
+
+# Function to time a scan and return its throughput in MB/s
+def throughput(scan, file_path):
+    start = time.perf_counter()
+    records = scan(file_path)
+    elapsed = time.perf_counter() - start
+    return records, os.path.getsize(file_path) / elapsed / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse throughput of the .abac policy reader")
+    parser.add_argument("file", nargs='?', type=str, help="Policy file to parse, a synthetic one is generated otherwise")
+    parser.add_argument("--scale", type=int, default=16, help="Scale factor of the synthetic policy")
+    parser.add_argument("--legacy", action='store_true',
+                        help="Also time the readlines and three findall regexes of the original reader")
+    args = parser.parse_args()
+
+    file_path = args.file
+    if file_path is None:
+        with tempfile.NamedTemporaryFile('w', suffix='.abac', delete=False) as file:
+            write_policy(file, 2 * args.scale, 2 * args.scale, args.scale)
+        file_path = file.name
+    try:
+        print(f"{os.path.getsize(file_path) / 2 ** 20:.1f} MB")
+        records, speed = throughput(streaming_scan, file_path)
+        print(f"streaming parser: {records} records, {speed:.1f} MB/s")
+        records, speed = throughput(tokenize_scan, file_path)
+        print(f"tokenizer only:   {records} records, {speed:.1f} MB/s")
+        if args.legacy:
+            records, speed = throughput(legacy_scan, file_path)
+            print(f"legacy regexes:   {records} records, {speed:.1f} MB/s")
+    finally:
+        if args.file is None:
+            os.remove(file_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# modules of the command line entry points, timed with python -X importtime
+ENTRY_MODULES = ('abac_reader', 'visualizer', 'compliance', 'export', 'app', 'query')
+# run in a child process: starts visualizer.main and prints the time once the first window is painted
+WINDOW_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+sys.argv = {argv!r}
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+run = QApplication.exec_
+
+def exec_(*args):
+    # the window is shown before the event loop starts, the first iteration paints it
+    QTimer.singleShot(0, lambda: print("window", time.time(), flush=True))
+    QTimer.singleShot(0, QApplication.instance().quit)
+    return run()
+
+QApplication.exec_ = exec_
+import visualizer
+visualizer.main()
+"""
+
+
+# Function to parse the output of -X importtime into (depth, module, self us, cumulative us) in import order
+# a module is listed after the ones it imports, which are one level deeper
+def parse_importtime(output):
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(self_us), int(cumulative)))
+    return imports
+
+
+# Function to time the import of a module in a fresh interpreter
+# returns the cumulative import time in ms and the slowest modules it imports directly, in ms
+def import_time(module, top=5):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True)
+    imports = parse_importtime(result.stderr)
+    end = next((i for i, (depth, name, _, _) in enumerate(imports) if depth == 0 and name == module), None)
+    if end is None:
+        print(f"Error: cannot import {module}\n{result.stderr}")
+        exit(1)
+    start = end
+    while start > 0 and imports[start - 1][0] > 0:
+        start -= 1
+    children = [(cumulative / 1000, name) for depth, name, _, cumulative in imports[start:end] if depth == 1]
+    return imports[end][3] / 1000, sorted(children, reverse=True)[:top]
+
+
+# Function to measure the wall-clock time from the start of visualizer.py to its first painted window, in ms
+def window_time(auth_file, log_files):
+    argv = ["visualizer.py", "-a", auth_file, "-l"] + log_files
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", WINDOW_PROBE.format(root=ROOT, argv=argv)], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("window "):
+            return (float(line.split()[1]) - start) * 1000
+    print(f"Error: the window did not open\n{result.stderr}")
+    exit(1)
+
+
+# Function to get the current commit of the repository, None outside of a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Function to read the last entry of the history file, None when there is none
+def last_entry(history):
+    try:
+        with open(history) as file:
+            lines = file.read().splitlines()
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of the command line entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every measure, the median is reported")
+    parser.add_argument("--history", type=str, default=os.path.join(ROOT, "startup_history.jsonl"),
+                        help="File where every run appends its results, one JSON line per run")
+    parser.add_argument("--no-window", action='store_true', help="Do not time the first window of visualizer.py")
+    args = parser.parse_args()
+
+    entry = {'date': time.strftime("%Y-%m-%dT%H:%M:%S"), 'commit': git_commit(), 'python': platform.python_version(),
+             'imports': {}}
+    for module in ENTRY_MODULES:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        entry['imports'][module] = round(statistics.median(total for total, _ in runs), 1)
+        slowest = ", ".join(f"{name} {ms:.0f}" for ms, name in runs[-1][1])
+        print(f"import {module:<12} {entry['imports'][module]:>8.1f} ms   {slowest}")
+
+    if not args.no_window:
+        # the window opens before the data is read, any small files will do
+        with tempfile.TemporaryDirectory() as directory:
+            auth_file = os.path.join(directory, "abac_res.txt")
+            log_file = os.path.join(directory, "data.log")
+            with open(auth_file, "w") as file:
+                file.write("['u1']\n['r1']\n{('u1', 'r1'): {'read'}}\n")
+            with open(log_file, "w") as file:
+                file.write("1 INFO <1,u1,r1,read>\n")
+            entry['window'] = round(statistics.median(window_time(auth_file, [log_file])
+                                                      for _ in range(args.repeat)), 1)
+        print(f"first window         {entry['window']:>8.1f} ms")
+
+    previous = last_entry(args.history)
+    if previous is not None:
+        print(f"previous run ({previous['date']}, {previous['commit']}):")
+        for name, ms in list(entry['imports'].items()) + [('window', entry.get('window'))]:
+            before = previous['imports'].get(name) if name != 'window' else previous.get('window')
+            if ms is not None and before:
+                print(f"  {name:<12} {before:>8.1f} -> {ms:>8.1f} ms ({(ms - before) / before:+.0%})")
+    with open(args.history, "a") as file:
+        file.write(json.dumps(entry) + "\n")
+
+
+if __name__ == '__main__':
+    main()
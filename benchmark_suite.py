@@ -0,0 +1,149 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import abac_reader
+import synthetic_abac
+
+# stages of the pipeline, from the policy to the views drawn by the window
+STAGES = ('gen_data', 'extract_data_from_log', 'generate_data', 'graph_index', 'views')
+
+
+# Function to get the peak resident set size of the current process, in MB
+def peak_rss():
+    # on Linux ru_maxrss survives exec and would start at the peak of the parent, VmHWM is the one of the process image
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1 << 20 if sys.platform == 'darwin' else 1 << 10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+# Function to load the data of the window from the files of a scale
+def load_view_data(paths):
+    from visualizer import add_data_arguments, load_data, parse_data_arguments
+
+    parser = argparse.ArgumentParser()
+    add_data_arguments(parser)
+    return load_data(parse_data_arguments(parser, ['-a', paths['auth'], '-l', paths['log'], '-p', paths['policy']]))
+
+
+# Function to prepare the views of the nodes of highest degree like App.update_ui before it draws them:
+# select the neighbours (clustered above CLUSTER_DEGREE) and compute their layout
+def prepare_views(data, count, layout):
+    from layout import LayoutCache
+    from render import select_view
+
+    graph = data['graph']
+    user_attributes, resource_attributes = data['attributes'] or ({}, {})
+    layouts = LayoutCache(layout)
+    prepared = 0
+    for view_name, interner, indptr, attributes in (("users", graph.users, graph.user_indptr, resource_attributes),
+                                                    ("resources", graph.resources, graph.resource_indptr,
+                                                     user_attributes)):
+        degrees = indptr[1:] - indptr[:-1]
+        for node in degrees.argsort()[::-1][:count]:
+            view = select_view(graph, view_name, interner.names[node], attributes)
+            layouts.get(view['name'], view['center'], 0, view['neighbors'])
+            prepared += 1
+    return prepared
+
+
+# Function to run a stage of the pipeline on the files of a scale, in a fresh process
+# the inputs of the stage are prepared first and are not timed
+# returns (items, bytes read, seconds, peak RSS before the stage in MB, peak RSS in MB)
+def _run_stage(stage, paths, views, layout):
+    from visualizer import build_view_data, count_log_files, extract_data_from_log, generate_data, \
+        load_authorizations
+
+    if stage == 'gen_data':
+        policy_users, policy_resources, _ = abac_reader.parse_policy(paths['policy'])
+        items, size = len(policy_users) * len(policy_resources), os.path.getsize(paths['policy'])
+        run = lambda: abac_reader.gen_data(paths['policy'], output_path=os.path.join(paths['directory'], 'gen.txt'))
+    elif stage == 'extract_data_from_log':
+        size = os.path.getsize(paths['log'])
+        run = lambda: len(list(extract_data_from_log(paths['log'])))
+    elif stage == 'generate_data':
+        _, _, authorizations = load_authorizations(paths['auth'])
+        log_data = list(extract_data_from_log(paths['log']))
+        items, size = len(log_data), 0
+        run = lambda: generate_data(log_data, authorizations)
+    elif stage == 'graph_index':
+        users, resources, authorizations = load_authorizations(paths['auth'])
+        operation_counts = count_log_files([paths['log']])
+        items, size = len(operation_counts), 0
+        run = lambda: build_view_data(operation_counts, users, resources, authorizations)
+    else:
+        data = load_view_data(paths)
+        size = 0
+        run = lambda: prepare_views(data, views, layout)
+
+    before = peak_rss()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    if stage in ('extract_data_from_log', 'views'):
+        items = result
+    return items, size, seconds, before, peak_rss()
+
+
+# Function to generate the policy, authorizations and log of a scale into a directory
+def generate_scale(directory, users, resources, entries, args):
+    paths = {'directory': directory, 'policy': os.path.join(directory, 'policy.abac'),
+             'log': os.path.join(directory, 'access.log'), 'auth': os.path.join(directory, 'abac_res.bin')}
+    user_names, resource_names, authorizations = synthetic_abac.generate(
+        paths['policy'], paths['log'], users, resources, entries, args.cardinality, args.rules, args.selectivity,
+        args.skew, seed=args.seed)
+    # the binary authorizations are memory mapped, so that loading them does not set the peak RSS of the stages
+    abac_reader.write_binary(paths['auth'], user_names, resource_names, authorizations)
+    return paths, len(authorizations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of the pipeline on synthetic policies")
+    parser.add_argument("--scales", nargs='+', type=int, default=[1, 2, 4, 8],
+                        help="Scale factors, each one multiplies the users, resources and log entries")
+    parser.add_argument("--users", type=int, default=200, help="Number of users at scale 1")
+    parser.add_argument("--resources", type=int, default=1000, help="Number of resources at scale 1")
+    parser.add_argument("--entries", type=int, default=100000, help="Number of log entries at scale 1")
+    parser.add_argument("--cardinality", type=int, default=10, help="Number of values of every attribute")
+    parser.add_argument("--rules", type=int, default=20, help="Number of rules")
+    parser.add_argument("--selectivity", type=float, default=0.01,
+                        help="Approximate fraction of the user x resource pairs matched by every rule")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the activity of the users")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, default=list(STAGES), help="Stages to time")
+    parser.add_argument("--views", type=int, default=20,
+                        help="Views of the users and of the resources of highest degree prepared by the views stage")
+    parser.add_argument("--layout", choices=['radial', 'bipartite', 'spring'], default='radial',
+                        help="Layout of the views stage")
+    args = parser.parse_args()
+
+    # every stage runs in a new process, so that its peak RSS is its own
+    context = multiprocessing.get_context('spawn')
+    print(f"{'scale':>5} {'users':>7} {'resources':>9} {'entries':>9} {'pairs':>9} {'stage':<22} {'items':>10} "
+          f"{'seconds':>8} {'items/s':>10} {'MB/s':>7} {'RSS MB':>7} {'+RSS MB':>7}")
+    for scale in args.scales:
+        users, resources, entries = args.users * scale, args.resources * scale, args.entries * scale
+        with tempfile.TemporaryDirectory() as directory:
+            paths, pairs = generate_scale(directory, users, resources, entries, args)
+            for stage in args.stages:
+                with context.Pool(1) as pool:
+                    items, size, seconds, before, peak = pool.apply(_run_stage, (stage, paths, args.views,
+                                                                                 args.layout))
+                throughput = f"{size / seconds / 1e6:.1f}" if size else "-"
+                print(f"{scale:>5} {users:>7} {resources:>9} {entries:>9} {pairs:>9} {stage:<22} {items:>10} "
+                      f"{seconds:>8.3f} {items / seconds:>10.0f} {throughput:>7} {peak:>7.0f} {peak - before:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import csv
+import json
+from collections import Counter
+
+import abac_reader
+import profiling
+from visualizer import Interner, LogColumns, count_log_columns, count_log_file, count_log_files_parallel, \
+    load_authorizations
+
+# bit fields of the packed triples, Python integers are unbounded so each id gets 32 bits and they never overlap
+USER_SHIFT = 64
+RESOURCE_SHIFT = 32
+ID_MASK = (1 << 32) - 1
+
+
+# Interned (user, resource, operation) triples packed in a single integer, to compare sets of triples by hash
+class TripleTable:
+    def __init__(self):
+        self.users = Interner()
+        self.resources = Interner()
+        self.operations = Interner()
+
+    def pack(self, user, resource, operation):
+        return self.users[user] << USER_SHIFT | self.resources[resource] << RESOURCE_SHIFT | self.operations[operation]
+
+    def unpack(self, key):
+        return (self.users.names[key >> USER_SHIFT], self.resources.names[key >> RESOURCE_SHIFT & ID_MASK],
+                self.operations.names[key & ID_MASK])
+
+
+# Function to compare the observed operations with the authorizations
+# the result has the unauthorized accesses with their counts, the granted but never used permissions
+# and, when the rules of the policy are given, the utilization of every rule
+# operation_counts is a {(user, resource, operation): count} dictionary or a LogColumns
+def compliance_report(authorizations, operation_counts, rule_matches=None, rules=None):
+    table = TripleTable()
+    if isinstance(operation_counts, LogColumns):
+        # the table starts with the ids of the columns, so the observed keys are packed from the id columns
+        table.users, table.resources, table.operations = (operation_counts.users.copy(),
+                                                          operation_counts.resources.copy(),
+                                                          operation_counts.operations.copy())
+        observed = {user << USER_SHIFT | resource << RESOURCE_SHIFT | operation: count
+                    for user, resource, operation, count in zip(operation_counts.user_column.tolist(),
+                                                                operation_counts.resource_column.tolist(),
+                                                                operation_counts.operation_column.tolist(),
+                                                                operation_counts.counts.tolist())}
+    else:
+        observed = {table.pack(*triple): count for triple, count in operation_counts.items()}
+    authorized = {table.pack(user, resource, operation)
+                  for (user, resource), operations in authorizations.items() for operation in operations}
+
+    report = {
+        'unauthorized': sorted(table.unpack(key) + (observed[key],) for key in observed.keys() - authorized),
+        'unused': sorted(table.unpack(key) for key in authorized - observed.keys()),
+        'rules': [],
+    }
+    for key, rule in zip(abac_reader.rule_keys(rules or []), rules or []):
+        granted = {table.pack(user, resource, operation)
+                   for user, resource in rule_matches[key] for operation in set(rule['operations'])}
+        used = granted & observed.keys()
+        report['rules'].append((key, len(rule_matches[key]), len(granted), len(used),
+                                round(len(used) / len(granted), 4) if granted else 0.0,
+                                sum(observed[i] for i in used)))
+    return report
+
+
+COLUMNS = {
+    'unauthorized': ('user', 'resource', 'operation', 'count'),
+    'unused': ('user', 'resource', 'operation'),
+    'rules': ('rule', 'pairs', 'granted', 'used', 'utilization', 'accesses'),
+}
+
+
+# Function to write the report as <prefix>_unauthorized.csv, <prefix>_unused.csv and <prefix>_rules.csv
+def write_csv(prefix, report):
+    for name, columns in COLUMNS.items():
+        with open(f"{prefix}_{name}.csv", 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            writer.writerows(report[name])
+
+
+# Function to write the report as a single <prefix>.json file
+def write_json(prefix, report):
+    with open(f"{prefix}.json", 'w') as file:
+        json.dump({name: [dict(zip(columns, row)) for row in report[name]] for name, columns in COLUMNS.items()},
+                  file, indent=1)
+
+
+WRITERS = {'csv': write_csv, 'json': write_json}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ABAC compliance report, authorized versus observed operations")
+    parser.add_argument("-a", "--auth_file", type=str, required=True, help="Path to the authorization file")
+    parser.add_argument("-l", "--log_file", nargs='+', type=str, required=True, help="Paths to the log files")
+    parser.add_argument("-p", "--policy", type=str, help="Path to the .abac policy, for the per-rule utilization")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes parsing the log files")
+    parser.add_argument("--columnar", action='store_true',
+                        help="Count the log entries with NumPy arrays of interned ids, without -j")
+    parser.add_argument("--format", choices=sorted(WRITERS), default='csv', help="Output format")
+    parser.add_argument("-o", "--output", type=str, default='compliance', help="Prefix of the output files")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start_from_arguments(args)
+
+    if args.columnar and args.jobs > 1:
+        print("Error: --columnar cannot be used with -j")
+        exit(1)
+    if args.columnar:
+        operation_counts = count_log_columns(args.log_file)
+    elif args.jobs > 1:
+        operation_counts = count_log_files_parallel(args.log_file, args.jobs)
+    else:
+        operation_counts = Counter()
+        for file_path in args.log_file:
+            count_log_file(file_path, operation_counts)
+    _, _, authorizations = load_authorizations(args.auth_file)
+
+    rules = rule_matches = None
+    if args.policy:
+        users, resources, rules = abac_reader.parse_policy(args.policy)
+        rule_matches = abac_reader.evaluate_rule_matches(rules, users, resources)
+
+    report = compliance_report(authorizations, operation_counts, rule_matches, rules)
+    WRITERS[args.format](args.output, report)
+    print(f"unauthorized accesses: {len(report['unauthorized'])}, "
+          f"unused permissions: {len(report['unused'])}, rules: {len(report['rules'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+import matplotlib
+
+# the views are rendered off screen, PyQt5 is never imported
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+
+import profiling
+from layout import LAYOUTS
+from render import RESOURCE_COLOR, USER_COLOR, draw_view, select_view
+from visualizer import add_data_arguments, load_data, parse_data_arguments
+
+IMAGE_FORMATS = ('png', 'svg')
+DATA_FORMATS = ('graphml', 'json')
+# views rendered by a worker process per task
+CHUNK_SIZE = 32
+
+_shared = {}
+
+
+# Function to make a file name from the name of a user or resource
+def file_name(name):
+    return re.sub(r'[^\w.-]', '_', name) or '_'
+
+
+# Function to list the (view, node) pairs to export
+# users and resources are lists of names, an empty list selects all the nodes of the graph and None none of them,
+# all the users and resources are selected when both are None
+def select_nodes(graph, users=None, resources=None):
+    if users is None and resources is None:
+        users, resources = [], []
+    views = []
+    if users is not None:
+        views += [("users", user) for user in (users or sorted(graph.users))]
+    if resources is not None:
+        views += [("resources", resource) for resource in (resources or sorted(graph.resources))]
+    return views
+
+
+def _init_export(data, layout, cluster_attribute, output, formats):
+    _shared.update(data=data, layout=LAYOUTS[layout], cluster_attribute=cluster_attribute, output=output,
+                   formats=formats)
+
+
+# Function to render a list of views to image files, in a worker process or in the main one
+# the views are drawn like App.update_ui draws them, returns the number of views written
+def _render_views(views):
+    data = _shared['data']
+    user_attributes, resource_attributes = data['attributes'] or ({}, {})
+    written = 0
+    for view_name, center in views:
+        if view_name == "users":
+            center_color, neighbor_color, attributes = USER_COLOR, RESOURCE_COLOR, resource_attributes
+        else:
+            center_color, neighbor_color, attributes = RESOURCE_COLOR, USER_COLOR, user_attributes
+        view = select_view(data['graph'], view_name, center, attributes, _shared['cluster_attribute'])
+        if view is None:
+            print(f"Warning: no {view_name[:-1]} {center} in the logs")
+            continue
+        figure = Figure(figsize=(8, 6))
+        ax = figure.add_subplot()
+        positions = _shared['layout'](center, view['neighbors'])
+        draw_view(ax, center, view['neighbors'], view['labels'], positions, center_color, neighbor_color,
+                  view['sizes'], view['label_degree'])
+        ax.set_title("ABAC Log Visualization")
+        for output_format in _shared['formats']:
+            figure.savefig(os.path.join(_shared['output'], view_name, f"{file_name(center)}.{output_format}"))
+        written += 1
+    return written
+
+
+# Function to render the views to image files with a pool of processes
+def render_views(data, views, output, formats, layout="radial", cluster_attribute="project", jobs=1):
+    for view_name in {view_name for view_name, _ in views}:
+        os.makedirs(os.path.join(output, view_name), exist_ok=True)
+    chunks = [views[i:i + CHUNK_SIZE] for i in range(0, len(views), CHUNK_SIZE)]
+    initargs = (data, layout, cluster_attribute, output, formats)
+    if jobs > 1:
+        # the data reaches the forked workers through the initializer without being pickled; fork is only safe on
+        # Linux, macOS spawns by default since forking after the system libraries started threads is not, and
+        # with spawn the data is pickled once per worker
+        context = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+        with context.Pool(jobs, initializer=_init_export, initargs=initargs) as pool:
+            return sum(pool.imap_unordered(_render_views, chunks))
+    _init_export(*initargs)
+    return sum(map(_render_views, chunks))
+
+
+# Function to list the neighbours of a view with the {operation: count} of their edges, None for an unknown node
+def view_operations(graph, view_name, center):
+    view = graph.user_view(center) if view_name == "users" else graph.resource_view(center)
+    if view is None:
+        return None
+    neighbors = []
+    for neighbor in view[0]:
+        pair = (center, neighbor) if view_name == "users" else (neighbor, center)
+        neighbors.append((neighbor, {operation: graph.operation_counts.get(pair + (operation,), 0)
+                                     for operation in sorted(graph.operations[pair])}))
+    return neighbors
+
+
+# Function to write the views as a list of {view, node, neighbors: [{node, operations: {operation: count}}]}
+def write_json(path, data, views):
+    records = []
+    for view_name, center in views:
+        neighbors = view_operations(data['graph'], view_name, center)
+        if neighbors is not None:
+            records.append({'view': view_name, 'node': center,
+                            'neighbors': [{'node': node, 'operations': operations} for node, operations in neighbors]})
+    with open(path, 'w') as file:
+        json.dump(records, file, indent=1)
+
+
+# Function to write the edges of the views as a single GraphML user -> resource graph
+# the nodes have a kind (user or resource), the edges the label of the views and their total count
+def write_graphml(path, data, views):
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    for view_name, center in views:
+        for neighbor, operations in view_operations(data['graph'], view_name, center) or []:
+            user, resource = (center, neighbor) if view_name == "users" else (neighbor, center)
+            graph.add_node(user, kind="user")
+            graph.add_node(resource, kind="resource")
+            label = ",".join(f"{operation}({count})" for operation, count in operations.items())
+            graph.add_edge(user, resource, label=label, count=sum(operations.values()))
+    nx.write_graphml(graph, path)
+
+
+DATA_WRITERS = {'graphml': write_graphml, 'json': write_json}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="visualizer.py export",
+                                     description="Render the views of the ABAC Log Visualizer without a window")
+    add_data_arguments(parser)
+    parser.add_argument("--users", nargs='*', type=str,
+                        help="Users whose view is exported, all of them when no name is given")
+    parser.add_argument("--resources", nargs='*', type=str,
+                        help="Resources whose view is exported, all of them when no name is given")
+    parser.add_argument("--format", nargs='+', choices=IMAGE_FORMATS + DATA_FORMATS, default=['svg'],
+                        help="Image formats write a file per view, graphml and json a single file with all the views")
+    parser.add_argument("-o", "--output", type=str, default="export", help="Output directory")
+    args = parse_data_arguments(parser, argv)
+    profiling.start_from_arguments(args)
+
+    data = load_data(args)
+    views = select_nodes(data['graph'], args.users, args.resources)
+    os.makedirs(args.output, exist_ok=True)
+    images = [output_format for output_format in args.format if output_format in IMAGE_FORMATS]
+    if images:
+        with profiling.span("render_views", views=len(views), jobs=args.jobs):
+            written = render_views(data, views, args.output, images, args.layout, args.cluster_attr, args.jobs)
+        print(f"{written} views rendered to {args.output} as {', '.join(images)}")
+    for output_format in args.format:
+        if output_format in DATA_WRITERS:
+            path = os.path.join(args.output, f"views.{output_format}")
+            with profiling.span("write_views", format=output_format):
+                DATA_WRITERS[output_format](path, data, views)
+            print(f"{len(views)} views written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+import profiling
+from visualizer import lazy_import
+
+# the layouts are listed by the parsers of every entry point, NumPy is imported when a view is first laid out
+np = lazy_import('numpy')
+
+# number of nodes on the first ring of the radial layout, ring k holds k times more
+RING_SIZE = 12
+
+
+# Function to place the selected node at the center and its neighbours on concentric rings, O(n)
+def radial_layout(center, neighbors, previous=None):
+    count = len(neighbors)
+    positions = {center: np.zeros(2)}
+    if not count:
+        return positions
+    # ring k holds RING_SIZE * k nodes, so the nodes up to ring k are RING_SIZE * k * (k + 1) / 2
+    index = np.arange(count)
+    ring = np.ceil((np.sqrt(1 + 8 * (index + 1) / RING_SIZE) - 1) / 2).astype(np.int64)
+    first = RING_SIZE * ring * (ring - 1) // 2
+    slots = np.minimum(RING_SIZE * ring, count - first)
+    angle = 2 * np.pi * (index - first) / slots
+    radius = ring / ring[-1]
+    coordinates = np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))
+    positions.update(zip(neighbors, coordinates))
+    return positions
+
+
+# Function to place the selected node on the left and its neighbours in a column on the right, O(n)
+def bipartite_layout(center, neighbors, previous=None):
+    positions = {center: np.array([-1.0, 0.0])}
+    count = len(neighbors)
+    if count:
+        height = np.linspace(1, -1, count) if count > 1 else np.zeros(1)
+        positions.update(zip(neighbors, np.column_stack((np.ones(count), height))))
+    return positions
+
+
+# Function to run a force directed layout, warm started from the previous positions when there are some
+# the nodes without a previous position start on the radial layout, so the result is deterministic
+def spring_layout(center, neighbors, previous=None):
+    # networkx takes a while to import and only this layout uses it
+    import networkx as nx
+
+    graph = nx.Graph()
+    graph.add_node(center)
+    graph.add_edges_from((center, neighbor) for neighbor in neighbors)
+    initial = radial_layout(center, neighbors)
+    if previous:
+        initial.update((node, position) for node, position in previous.items() if node in initial)
+    iterations = 15 if previous else 50
+    profiling.count("layout iterations", iterations)
+    return nx.spring_layout(graph, pos=initial, iterations=iterations, seed=0)
+
+
+LAYOUTS = {'radial': radial_layout, 'bipartite': bipartite_layout, 'spring': spring_layout}
+
+
+# LRU cache of the node positions, keyed by (view, selected node, graph version)
+# a miss on a newer graph version is warm started from the latest positions of the same view and node
+class LayoutCache:
+    def __init__(self, layout='radial', size=256):
+        self.layout = LAYOUTS[layout]
+        self.size = size
+        self.entries = OrderedDict()
+        self.latest = {}
+
+    def lookup(self, view, node, version):
+        key = (view, node, version)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        return None
+
+    # Latest positions of a view and node, on any graph version, to warm start a new layout
+    def previous(self, view, node):
+        return self.entries.get(self.latest.get((view, node)))
+
+    def put(self, view, node, version, positions):
+        key = (view, node, version)
+        self.entries[key] = positions
+        self.latest[(view, node)] = key
+        if len(self.entries) > self.size:
+            old, _ = self.entries.popitem(last=False)
+            if self.latest.get(old[:2]) == old:
+                del self.latest[old[:2]]
+
+    def get(self, view, node, version, neighbors):
+        positions = self.lookup(view, node, version)
+        if positions is None:
+            with profiling.span("layout", layout=self.layout.__name__, nodes=len(neighbors) + 1):
+                positions = self.layout(node, neighbors, self.previous(view, node))
+            self.put(view, node, version, positions)
+        return positions
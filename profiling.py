@@ -0,0 +1,165 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+# number of lines of the tracemalloc report
+MEMORY_TOP = 30
+
+# spans and counters are only recorded between start and stop, otherwise span returns a shared no-op context
+_state = {'enabled': False, 'trace': None, 'cpu': None, 'memory': False, 'origin': 0.0}
+_lock = threading.Lock()
+_events = []
+_threads = {}
+# totals of the spans, name: [calls, seconds], and of the counters, name: value
+totals = {}
+counters = Counter()
+
+
+# Context of a timed span, the complete event is recorded when it exits
+class Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        thread = threading.current_thread()
+        with _lock:
+            _threads.setdefault(thread.native_id, thread.name)
+            _events.append({'name': self.name, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.native_id,
+                            'ts': (self.start - _state['origin']) * 1e6, 'dur': (end - self.start) * 1e6,
+                            'args': self.args})
+            total = totals.setdefault(self.name, [0, 0.0])
+            total[0] += 1
+            total[1] += end - self.start
+        return False
+
+
+# Context doing nothing, returned by span when the profiler is not running
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+# Function to tell whether the profiler is running, to skip computing the values of costly counters
+def enabled():
+    return _state['enabled']
+
+
+# Function to time a block of code: with profiling.span("name", key=value): ...
+# the keyword arguments are shown with the event in the trace viewer
+def span(name, /, **args):
+    return Span(name, args) if _state['enabled'] else NULL_SPAN
+
+
+# Function to add a value to a counter, e.g. the number of rows parsed
+# the trace gets the running total of the counter as a counter event
+def count(name, value=1):
+    if not _state['enabled']:
+        return
+    with _lock:
+        counters[name] += value
+        _events.append({'name': name, 'ph': 'C', 'pid': os.getpid(),
+                        'ts': (time.perf_counter() - _state['origin']) * 1e6, 'args': {'value': counters[name]}})
+
+
+# Function to start recording the spans and counters, the trace is written to trace_path by stop or at exit
+# with cpu the functions are also profiled with cProfile and with memory the allocations are traced with tracemalloc
+def start(trace_path, cpu=False, memory=False):
+    # cProfile and tracemalloc are only imported when they are used, they would slow the startup of every entry point
+    import cProfile
+    import tracemalloc
+
+    if _state['enabled']:
+        return
+    _events.clear()
+    totals.clear()
+    counters.clear()
+    _state.update(enabled=True, trace=trace_path, memory=memory, origin=time.perf_counter())
+    if memory:
+        tracemalloc.start()
+    if cpu:
+        _state['cpu'] = cProfile.Profile()
+        _state['cpu'].enable()
+    atexit.register(stop)
+
+
+# Function to start the profiler when --profile is given, see add_arguments
+def start_from_arguments(args):
+    if args.profile:
+        start(args.profile, args.profile_cpu, args.profile_memory)
+
+
+# Function to add the profiling options to a parser
+def add_arguments(parser):
+    parser.add_argument("--profile", type=str, metavar="TRACE_JSON",
+                        help="Write the timings and counters of the stages to a Chrome trace, e.g. profile.json, "
+                             "to open in chrome://tracing or Perfetto")
+    parser.add_argument("--profile-cpu", action='store_true',
+                        help="With --profile, also write a cProfile dump of the functions next to the trace (.prof)")
+    parser.add_argument("--profile-memory", action='store_true',
+                        help="With --profile, also write the top allocations of tracemalloc next to the trace "
+                             "(.memory.txt)")
+
+
+# Function to format the totals of the spans and the counters, one line each, slowest spans first
+def summary():
+    with _lock:
+        spans = sorted(totals.items(), key=lambda item: -item[1][1])
+        values = sorted(counters.items())
+    lines = [f"{name}: {seconds * 1000:.1f} ms" + (f" ({calls} calls)" if calls > 1 else "")
+             for name, (calls, seconds) in spans]
+    lines += [f"{name}: {value:,}" for name, value in values]
+    return lines
+
+
+# Function to stop the profiler and write the trace, and the cProfile and tracemalloc reports when they were enabled
+def stop():
+    import json
+    import tracemalloc
+
+    if not _state['enabled']:
+        return
+    _state['enabled'] = False
+    atexit.unregister(stop)
+    base = os.path.splitext(_state['trace'])[0]
+    written = [_state['trace']]
+    if _state['cpu'] is not None:
+        _state['cpu'].disable()
+        _state['cpu'].dump_stats(base + '.prof')
+        _state['cpu'] = None
+        written.append(base + '.prof')
+    if _state['memory']:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        with open(base + '.memory.txt', 'w') as file:
+            file.write(f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+            for stat in snapshot.statistics('lineno')[:MEMORY_TOP]:
+                file.write(f"{stat}\n")
+        written.append(base + '.memory.txt')
+
+    with _lock:
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                    for tid, name in _threads.items()]
+        trace = {'traceEvents': metadata + _events, 'displayTimeUnit': 'ms'}
+    with open(_state['trace'], 'w') as file:
+        json.dump(trace, file)
+    print(f"Profile written to {', '.join(written)}")
@@ -0,0 +1,303 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import abac_reader
+import profiling
+from visualizer import BinaryAuthorizations, Interner, LogColumns, count_log_files, load_authorizations
+
+
+# Function to parse an attribute predicate in the syntax of the rule conditions, an empty predicate matches everything
+# e.g. "type in {task}, proprietary in {false}" or "expertise supseteqln {{design}}"
+def parse_predicate(text):
+    conditions = [condition for condition in text.split(',') if condition.strip()]
+    for condition in conditions:
+        if ' in ' not in condition and ' supseteqln ' not in condition:
+            raise ValueError(f"unknown condition '{condition.strip()}', expected 'attribute in {{values}}' "
+                             f"or 'attribute supseteqln {{{{values}}}}'")
+    return abac_reader.attr_value(conditions)
+
+
+# Inverted indexes of the attributes of the users or the resources, the entities are numbered by an Interner
+# the (attribute, value), (attribute, set member) and attribute keys of abac_reader.build_index map to id arrays
+class AttributeIndex:
+    def __init__(self, interner, attributes):
+        positions = np.fromiter(map(interner.__getitem__, attributes), dtype=np.int64, count=len(attributes))
+        self.size = len(interner)
+        index = abac_reader.build_index(attributes.values())
+        self.index = {kind: {key: positions[np.fromiter(ids, dtype=np.int64, count=len(ids))]
+                             for key, ids in keys.items()}
+                      for kind, keys in index.items()}
+
+    # Boolean bitmap of the entities of an index key
+    def bitmap(self, kind, key):
+        bitmap = np.zeros(self.size, dtype=bool)
+        ids = self.index[kind].get(key)
+        if ids is not None:
+            bitmap[ids] = True
+        return bitmap
+
+    # Boolean bitmap of the entities matching a parsed predicate, like abac_reader.resolve_attr_value
+    # a condition on an attribute that no entity has is an error rather than an empty match, e.g. without the policy
+    def match(self, predicate):
+        names = [name for name, _ in predicate['in'] + predicate['supseteqln']]
+        if names and not self.index['has']:
+            raise ValueError("the predicate needs the attributes of the policy, none were loaded")
+        for name in names:
+            if name not in self.index['has']:
+                raise ValueError(f"unknown attribute '{name}'")
+        matched = np.ones(self.size, dtype=bool)
+        for name, value in predicate['in']:
+            condition = np.zeros(self.size, dtype=bool)
+            for token in value:
+                condition |= self.bitmap('scalar', (name, token))
+            matched &= condition
+        for name, value in predicate['supseteqln']:
+            condition = np.zeros(self.size, dtype=bool)
+            for alternative in value:
+                ids = self.bitmap('has', name)
+                for token in alternative:
+                    ids &= self.bitmap('member', (name, token))
+                condition |= ids
+            matched &= condition
+        return matched
+
+
+# Query index over the authorizations of abac_reader, the policy attributes and rules and the log counts
+# the authorized pairs are columns sorted by user with a bitmask of their operations and every operation has a
+# prebuilt boolean bitmap over the pairs, so that a query is a few vectorized passes over the columns
+class QueryIndex:
+    def __init__(self, users, resources, authorizations, attributes=None, rules=None, operation_counts=None):
+        user_attributes, resource_attributes = attributes or ({}, {})
+        operation_counts = operation_counts or {}
+        self.users = Interner()
+        self.resources = Interner()
+        for user in users:
+            self.users[user]
+        for resource in resources:
+            self.resources[resource]
+
+        # Authorized pairs, the binary format already holds them as columns with operation bitmasks
+        if isinstance(authorizations, BinaryAuthorizations):
+            self.operations = list(authorizations.operations)
+            user_map = np.array([self.users[user] for user in authorizations.users], dtype=np.int64)
+            resource_map = np.array([self.resources[resource] for resource in authorizations.resources],
+                                    dtype=np.int64)
+            user_ids = user_map[np.frombuffer(authorizations.user_ids, dtype=np.uint32)]
+            resource_ids = resource_map[np.frombuffer(authorizations.resource_ids, dtype=np.uint32)]
+            masks = np.frombuffer(authorizations.masks, dtype=np.uint64)
+        else:
+            self.operations = sorted({operation for operations in authorizations.values() for operation in operations})
+            bits = {operation: 1 << i for i, operation in enumerate(self.operations)}
+            user_ids = np.fromiter((self.users[user] for user, _ in authorizations), dtype=np.int64,
+                                   count=len(authorizations))
+            resource_ids = np.fromiter((self.resources[resource] for _, resource in authorizations), dtype=np.int64,
+                                       count=len(authorizations))
+            masks = np.fromiter((sum(bits[operation] for operation in set(operations))
+                                 for operations in authorizations.values()), dtype=np.uint64, count=len(authorizations))
+        order = np.lexsort((resource_ids, user_ids))
+        self.pair_users = user_ids[order]
+        self.pair_resources = resource_ids[order]
+        self.pair_masks = masks[order]
+
+        # Names of the policy and the logs, so that the indexes below cover every user and resource
+        for user in user_attributes:
+            self.users[user]
+        for resource in resource_attributes:
+            self.resources[resource]
+        if isinstance(operation_counts, LogColumns):
+            log_users, log_resources = operation_counts.users.names, operation_counts.resources.names
+        else:
+            log_users = [user for user, _, _ in operation_counts]
+            log_resources = [resource for _, resource, _ in operation_counts]
+        for user in log_users:
+            self.users[user]
+        for resource in log_resources:
+            self.resources[resource]
+
+        self.user_indptr = np.zeros(len(self.users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.pair_users, minlength=len(self.users)), out=self.user_indptr[1:])
+        self.operation_pairs = {operation: (self.pair_masks >> np.uint64(i) & np.uint64(1)).astype(bool)
+                                for i, operation in enumerate(self.operations)}
+        # and a bitmap over the resources on which some user is allowed it
+        self.operation_resources = {operation: np.bincount(self.pair_resources[pairs],
+                                                           minlength=len(self.resources)) > 0
+                                    for operation, pairs in self.operation_pairs.items()}
+        self.user_index = AttributeIndex(self.users, user_attributes)
+        self.resource_index = AttributeIndex(self.resources, resource_attributes)
+        self.user_attributes = user_attributes
+        self.resource_attributes = resource_attributes
+        self.rules = [(rule, abac_reader.compile_rule(rule)) for rule in rules or []]
+
+        # Accesses of every resource in the logs, in total and per operation
+        if isinstance(operation_counts, LogColumns):
+            # the ids of the columns are mapped to the ones of the index, without going through the triples
+            resource_map = np.fromiter(map(self.resources.__getitem__, log_resources), dtype=np.int64,
+                                       count=len(log_resources))
+            resource_ids = resource_map[operation_counts.resource_column]
+            log_operations = {operation: i for i, operation in enumerate(sorted(operation_counts.operations.names))}
+            operation_map = np.array([log_operations[operation] for operation in operation_counts.operations.names],
+                                     dtype=np.int64)
+            operation_ids = operation_map[operation_counts.operation_column]
+            weights = operation_counts.counts.astype(np.float64)
+        else:
+            count = len(operation_counts)
+            resource_ids = np.fromiter((self.resources[resource] for _, resource, _ in operation_counts),
+                                       dtype=np.int64, count=count)
+            log_operations = {operation: i for i, operation in enumerate(sorted({key[2] for key in operation_counts}))}
+            operation_ids = np.fromiter((log_operations[operation] for _, _, operation in operation_counts),
+                                        dtype=np.int64, count=count)
+            weights = np.fromiter(operation_counts.values(), dtype=np.float64, count=count)
+        self.access_counts = {None: np.bincount(resource_ids, weights, minlength=len(self.resources))}
+        for operation, i in log_operations.items():
+            selected = operation_ids == i
+            self.access_counts[operation] = np.bincount(resource_ids[selected], weights[selected],
+                                                        minlength=len(self.resources))
+
+    # Boolean bitmap over the pairs granting an operation, all the pairs when operation is None
+    def pairs_of(self, operation):
+        if operation is None:
+            return np.ones(len(self.pair_masks), dtype=bool)
+        pairs = self.operation_pairs.get(operation)
+        return pairs if pairs is not None else np.zeros(len(self.pair_masks), dtype=bool)
+
+    # Users allowed to perform an operation (any when None) on at least one resource matching the predicate
+    def who_can(self, operation=None, predicate=""):
+        if isinstance(predicate, str):
+            predicate = parse_predicate(predicate)
+        selected = self.pairs_of(operation)
+        if predicate['in'] or predicate['supseteqln']:
+            selected = selected & self.resource_index.match(predicate)[self.pair_resources]
+        # the pairs are sorted by user, so the users of the selected pairs are the starts of their runs
+        users = self.pair_users[selected]
+        users = users[np.flatnonzero(np.diff(users, prepend=-1))]
+        return [self.users.names[i] for i in users]
+
+    # Resources matching the predicate, on which some user is allowed the operation when one is given
+    def resources_where(self, predicate="", operation=None):
+        resources = self.resource_index.match(parse_predicate(predicate) if isinstance(predicate, str) else predicate)
+        if operation is not None:
+            resources &= self.operation_resources.get(operation, False)
+        return [self.resources.names[i] for i in np.flatnonzero(resources)]
+
+    # Operations a user is allowed on every resource, {resource: [operations]}
+    def permissions(self, user):
+        if user not in self.users:
+            return {}
+        start, end = self.user_indptr[self.users[user]], self.user_indptr[self.users[user] + 1]
+        return {self.resources.names[resource]: [operation for i, operation in enumerate(self.operations)
+                                                 if int(mask) >> i & 1]
+                for resource, mask in zip(self.pair_resources[start:end], self.pair_masks[start:end])}
+
+    # Rules of the policy granting operations on a resource to a user, as (rule name, operations)
+    def rules_granting(self, user, resource):
+        if not self.rules:
+            raise ValueError("the rules need the policy")
+        user_entity = self.user_attributes.get(user)
+        resource_entity = self.resource_attributes.get(resource)
+        if user_entity is None or resource_entity is None:
+            return []
+        return [(rule['name'], rule['operations']) for rule, (user_check, resource_check, check) in self.rules
+                if user_check(user_entity) and resource_check(resource_entity) and check(user_entity, resource_entity)]
+
+    # Most accessed resources of the logs, with the number of accesses, for an operation or all of them
+    def top_resources(self, k=10, operation=None):
+        counts = self.access_counts.get(operation)
+        if counts is None or not len(counts):
+            return []
+        k = min(k, len(counts))
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.argsort(-counts[top], kind='stable')]
+        return [(self.resources.names[i], int(counts[i])) for i in top if counts[i] > 0]
+
+
+# Function to build the query index of the authorization file, the policy and the logs
+def load_index(auth_file, policy=None, log_files=None, jobs=1, columnar=False):
+    with profiling.span("load_query_data"):
+        users, resources, authorizations = load_authorizations(auth_file)
+        attributes = rules = None
+        if policy:
+            policy_users, policy_resources, rules = abac_reader.parse_policy(policy)
+            attributes = ({user['uid']: user for user in policy_users},
+                          {resource['rid']: resource for resource in policy_resources})
+        operation_counts = count_log_files(log_files, jobs, columnar=columnar) if log_files else None
+    with profiling.span("query_index", pairs=len(authorizations)):
+        return QueryIndex(users, resources, authorizations, attributes, rules, operation_counts)
+
+
+def main():
+    # the data options are given after the query, e.g. query.py who-can read -a abac_res.txt -p policy.abac
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument("-a", "--auth_file", type=str, required=True, help="Path to the authorization file")
+    data.add_argument("-p", "--policy", type=str, help="Path to the .abac policy, for the predicates and the rules")
+    data.add_argument("-l", "--log_file", nargs='+', type=str, help="Paths to the log files, for the top resources")
+    data.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes parsing the log files")
+    data.add_argument("--columnar", action='store_true',
+                      help="Count the log entries with NumPy arrays of interned ids, without -j")
+    profiling.add_arguments(data)
+    parser = argparse.ArgumentParser(description="Queries over the authorizations, the policy and the log counts")
+    queries = parser.add_subparsers(dest="query", required=True)
+    who_can = queries.add_parser("who-can", parents=[data],
+                                 help="Users allowed an operation on resources matching a predicate")
+    who_can.add_argument("operation", type=str, help="Operation, e.g. read")
+    who_can.add_argument("--where", type=str, default="",
+                         help="Predicate on the resources in the syntax of the rules, e.g. \"type in {task}\"")
+    resources = queries.add_parser("resources", parents=[data], help="Resources matching a predicate")
+    resources.add_argument("--where", type=str, default="", help="Predicate on the resources")
+    resources.add_argument("--operation", type=str, help="Only the resources on which some user is allowed it")
+    permissions = queries.add_parser("permissions", parents=[data],
+                                     help="Operations a user is allowed on every resource")
+    permissions.add_argument("user", type=str)
+    rules = queries.add_parser("rules", parents=[data],
+                               help="Rules granting operations on a resource to a user, needs -p")
+    rules.add_argument("user", type=str)
+    rules.add_argument("resource", type=str)
+    top = queries.add_parser("top", parents=[data], help="Most accessed resources of the logs, needs -l")
+    top.add_argument("-k", type=int, default=10, help="Number of resources")
+    top.add_argument("--operation", type=str, help="Only count the accesses with this operation")
+    args = parser.parse_args()
+    profiling.start_from_arguments(args)
+
+    if args.query == "rules" and not args.policy:
+        print("Error: the rules query needs the policy, see -p")
+        exit(1)
+    if getattr(args, 'where', "").strip() and not args.policy:
+        print("Error: --where needs the policy, see -p")
+        exit(1)
+    if args.query == "top" and not args.log_file:
+        print("Error: the top query needs the logs, see -l")
+        exit(1)
+    if args.columnar and args.jobs > 1:
+        print("Error: --columnar cannot be used with -j")
+        exit(1)
+    index = load_index(args.auth_file, args.policy, args.log_file, args.jobs, args.columnar)
+
+    start = time.perf_counter()
+    try:
+        with profiling.span("query", query=args.query):
+            if args.query == "who-can":
+                lines = index.who_can(args.operation, args.where)
+            elif args.query == "resources":
+                lines = index.resources_where(args.where, args.operation)
+            elif args.query == "permissions":
+                lines = [f"{resource}: {' '.join(operations)}"
+                         for resource, operations in index.permissions(args.user).items()]
+            elif args.query == "rules":
+                lines = [f"{name}: {' '.join(operations)}" for name, operations in
+                         index.rules_granting(args.user, args.resource)]
+            else:
+                lines = [f"{resource}: {count}" for resource, count in index.top_resources(args.k, args.operation)]
+    except ValueError as error:
+        print(f"Error: {error}")
+        exit(1)
+    elapsed = time.perf_counter() - start
+    for line in lines:
+        print(line)
+    # the summary goes to stderr so that the results can be piped
+    print(f"{len(lines)} results in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
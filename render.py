@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+import profiling
+
+# above this degree the node and edge labels are hidden
+LABEL_DEGREE = 50
+# above this degree the neighbours are grouped by attribute, a click on a group shows its members
+CLUSTER_DEGREE = 200
+NODE_SIZE = 1000
+USER_COLOR = "#AEC6CF"
+RESOURCE_COLOR = '#FFD700'
+
+
+# Function to format an attribute value as a cluster name
+def format_value(value):
+    if value is None:
+        return "?"
+    if isinstance(value, frozenset):
+        return " ".join(sorted(value))
+    return value
+
+
+# Function to group the neighbours of a view by the value of one of their attributes
+# the result maps every value to the (neighbours, labels) having it
+def cluster_neighbors(neighbors, labels, attributes, attribute):
+    groups = {}
+    for node, label in zip(neighbors, labels):
+        value = format_value(attributes.get(node, {}).get(attribute))
+        members = groups.setdefault(value, ([], []))
+        members[0].append(node)
+        members[1].append(label)
+    return dict(sorted(groups.items()))
+
+
+# Function to select what the view of a node draws, from a visualizer.GraphIndex
+# view_name is users (the resources of a user) or resources (the users of a resource), above CLUSTER_DEGREE
+# neighbours and with attributes the neighbours are grouped by cluster_attribute, unless drill names the group to show
+# returns the name of the view for the layout cache, the neighbours, labels, sizes and label_degree of draw_view and
+# whether the neighbours are groups, None for an unknown node
+def select_view(graph, view_name, center, attributes=None, cluster_attribute="project", drill=None):
+    # Slice the prebuilt adjacency index, the edge labels hold the number of occurrences
+    view = graph.user_view(center) if view_name == "users" else graph.resource_view(center)
+    if view is None:
+        return None
+    neighbors, labels = view
+    selected = {'center': center, 'sizes': None, 'label_degree': LABEL_DEGREE, 'clusters': False}
+    # Group the neighbours of a high-degree node by attribute, a click on a group drills down into it
+    if attributes and len(neighbors) > CLUSTER_DEGREE:
+        groups = cluster_neighbors(neighbors, labels, attributes, cluster_attribute)
+        if drill is not None and drill in groups:
+            neighbors, labels = groups[drill]
+            view_name += "/" + drill
+        elif len(groups) > 1:
+            selected['clusters'] = True
+            neighbors = list(groups)
+            labels = [str(len(members)) for members, _ in groups.values()]
+            selected['sizes'] = [NODE_SIZE * min(1.0, 0.2 + len(members) / len(view[0]))
+                                 for members, _ in groups.values()]
+            selected['label_degree'] = CLUSTER_DEGREE
+            view_name += "/clusters"
+    selected.update(name=view_name, neighbors=neighbors, labels=labels)
+    return selected
+
+
+# Function to draw a star view with a constant number of artists
+# the edges are a single LineCollection and the neighbours a single scatter, the labels are only drawn up to
+# label_degree neighbours, sizes optionally scales the neighbour markers (e.g. by cluster size)
+# returns the scatter of the neighbours and the one of the center, for picking
+def draw_view(ax, center, neighbors, labels, positions, center_color, neighbor_color, sizes=None,
+              label_degree=LABEL_DEGREE):
+    ax.set_axis_off()
+    origin = np.asarray(positions[center], dtype=float)
+    xy = np.array([positions[node] for node in neighbors], dtype=float).reshape(-1, 2)
+    detailed = len(neighbors) <= label_degree
+
+    segments = np.stack((np.broadcast_to(origin, xy.shape), xy), axis=1)
+    ax.add_collection(LineCollection(segments, colors='black', linewidths=2 if detailed else 0.3, zorder=1))
+    if sizes is None:
+        sizes = NODE_SIZE if detailed else max(4.0, min(NODE_SIZE / 4, 4 * NODE_SIZE / len(neighbors)))
+    neighbor_points = ax.scatter(xy[:, 0], xy[:, 1], s=sizes, c=neighbor_color, zorder=2, picker=True)
+    center_points = ax.scatter([origin[0]], [origin[1]], s=NODE_SIZE, c=center_color, zorder=3, picker=True)
+
+    text = {'ha': 'center', 'va': 'center', 'fontsize': 10, 'fontweight': 'bold', 'zorder': 5}
+    ax.text(origin[0], origin[1], center, **text)
+    if detailed:
+        for node, label, (x, y) in zip(neighbors, labels, xy):
+            ax.text(x, y, node, **text)
+            angle = math.degrees(math.atan2(y - origin[1], x - origin[0]))
+            if angle > 90 or angle < -90:
+                angle += 180
+            ax.text((x + origin[0]) / 2, (y + origin[1]) / 2, label, color='red', rotation=angle,
+                    rotation_mode='anchor', ha='center', va='center', fontsize=8, zorder=4,
+                    bbox={'boxstyle': 'round', 'fc': 'white', 'ec': 'none', 'alpha': 0.8})
+    ax.margins(0.15)
+    ax.autoscale_view()
+    # the edges, the two scatters and the labels of the center, the neighbours and the edges
+    profiling.count("artists drawn", 4 + (2 * len(neighbors) if detailed else 0))
+    return neighbor_points, center_points
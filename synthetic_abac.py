@@ -0,0 +1,136 @@
+import argparse
+import random
+
+import abac_reader
+
+OPERATIONS = ('read', 'write', 'approve', 'request', 'setStatus', 'setCost', 'setSchedule')
+# mean number of values of the set attributes of the users
+ROLES_PER_USER = 2
+PROJECTS_PER_USER = 2.5
+
+
+# Function to name the values of an attribute, e.g. dept0 ... dept9
+def attribute_values(name, cardinality):
+    return [f"{name}{i}" for i in range(cardinality)]
+
+
+# Function to write a synthetic policy in the syntax of project-management.abac
+# users get a department, a set of roles and a set of projects, resources a department, a type and a project,
+# every attribute takes `cardinality` values; the rules pick their resource types so that each one matches about
+# `selectivity` of the user x resource pairs
+def write_policy(file, users, resources, cardinality=10, rules=20, selectivity=0.01, seed=0):
+    rng = random.Random(seed)
+    departments = attribute_values("dept", cardinality)
+    roles = attribute_values("role", cardinality)
+    projects = attribute_values("proj", cardinality)
+    types = attribute_values("type", cardinality)
+    for u in range(users):
+        user_roles = rng.sample(roles, min(cardinality, rng.randint(1, 2 * ROLES_PER_USER - 1)))
+        user_projects = rng.sample(projects, min(cardinality, rng.randint(1, int(2 * PROJECTS_PER_USER))))
+        file.write(f"userAttrib(user{u}, department={rng.choice(departments)}, roles={{{' '.join(user_roles)}}}, "
+                   f"projects={{{' '.join(user_projects)}}})\n")
+    for r in range(resources):
+        file.write(f"resourceAttrib(res{r}, department={rng.choice(departments)}, type={rng.choice(types)}, "
+                   f"project={rng.choice(projects)})\n")
+
+    # fraction of the pairs passing the user and attribute conditions of every kind of rule, the resource conditions
+    # make up the rest of the selectivity with a number of types, and of departments below 1 / cardinality
+    kinds = (
+        (ROLES_PER_USER / cardinality, lambda: f"roles supseteqln {{{{{rng.choice(roles)}}}}}", ""),
+        (PROJECTS_PER_USER / cardinality, lambda: "", "projects ] project"),
+        (1 / cardinality, lambda: "", "department = department"),
+    )
+    for i in range(rules):
+        fraction, user_condition, attribute_condition = kinds[i % len(kinds)]
+        target = selectivity / min(1.0, fraction) * cardinality
+        count = max(1, min(cardinality, round(target)))
+        resource_condition = f"type in {{{' '.join(rng.sample(types, count))}}}"
+        if target < 0.5:
+            count = max(1, round(target * cardinality))
+            resource_condition += f", department in {{{' '.join(rng.sample(departments, count))}}}"
+        operations = " ".join(rng.sample(OPERATIONS, rng.randint(1, 2)))
+        file.write(f"rule(rule{i}; {user_condition()}; {resource_condition}; {{{operations}}}; "
+                   f"{attribute_condition})\n")
+
+
+# Function to write log entries <timestamp,user,resource,operation> drawn from the authorizations
+# the activity of the users follows a Zipf law of exponent skew and every user mostly uses a few of its resources,
+# a fraction `unauthorized` of the entries are random triples, the entries arrive at `rate` per second on average
+def write_log(file, authorizations, users, resources, entries, skew=1.1, unauthorized=0.01, start=1700000000,
+              rate=100.0, seed=0):
+    rng = random.Random(seed)
+    granted = {}
+    for (user, resource), operations in sorted(authorizations.items()):
+        granted.setdefault(user, []).append((resource, sorted(operations)))
+    active = sorted(granted)
+    rng.shuffle(active)
+    weights = [1 / (rank + 1) ** skew for rank in range(len(active))]
+    cum_weights = [0.0] * len(active)
+    total = 0.0
+    for i, weight in enumerate(weights):
+        total += weight
+        cum_weights[i] = total
+
+    elapsed = 0.0
+    written = 0
+    while written < entries:
+        size = min(entries - written, 1 << 16)
+        picked = rng.choices(active, cum_weights=cum_weights, k=size) if active else [None] * size
+        lines = []
+        for user in picked:
+            elapsed += rng.expovariate(rate)
+            timestamp = start + int(elapsed)
+            if user is None or rng.random() < unauthorized:
+                user, resource, operation = rng.choice(users), rng.choice(resources), rng.choice(OPERATIONS)
+            else:
+                items = granted[user]
+                resource, operations = items[int(len(items) * rng.random() ** (1 + skew))]
+                operation = rng.choice(operations)
+            lines.append(f"{timestamp} INFO <{timestamp},{user},{resource},{operation}>\n")
+        file.writelines(lines)
+        written += size
+
+
+# Function to write a synthetic policy and a log of its authorizations
+# returns the users, resources and authorizations of the policy
+def generate(policy_path, log_path, users, resources, entries, cardinality=10, rules=20, selectivity=0.01,
+             skew=1.1, unauthorized=0.01, seed=0):
+    with open(policy_path, 'w') as file:
+        write_policy(file, users, resources, cardinality, rules, selectivity, seed)
+    policy_users, policy_resources, policy_rules = abac_reader.parse_policy(policy_path)
+    authorizations = abac_reader.evaluate_rules_indexed(policy_rules, policy_users, policy_resources)
+    user_names = [user['uid'] for user in policy_users]
+    resource_names = [resource['rid'] for resource in policy_resources]
+    if log_path is not None:
+        with open(log_path, 'w', buffering=1 << 20) as file:
+            write_log(file, authorizations, user_names, resource_names, entries, skew, unauthorized, seed=seed)
+    return user_names, resource_names, authorizations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic ABAC policy and access log generator")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users")
+    parser.add_argument("--resources", type=int, default=5000, help="Number of resources")
+    parser.add_argument("--cardinality", type=int, default=10,
+                        help="Number of values of every attribute (departments, roles, projects, types)")
+    parser.add_argument("--rules", type=int, default=20, help="Number of rules")
+    parser.add_argument("--selectivity", type=float, default=0.01,
+                        help="Approximate fraction of the user x resource pairs matched by every rule")
+    parser.add_argument("--entries", type=int, default=100000, help="Number of log entries")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the activity of the users")
+    parser.add_argument("--unauthorized", type=float, default=0.01, help="Fraction of random, mostly denied, entries")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+    parser.add_argument("--policy", type=str, default="synthetic.abac", help="Output policy file")
+    parser.add_argument("--log", type=str, default="synthetic.log", help="Output log file")
+    args = parser.parse_args()
+
+    users, resources, authorizations = generate(args.policy, args.log, args.users, args.resources, args.entries,
+                                                args.cardinality, args.rules, args.selectivity, args.skew,
+                                                args.unauthorized, args.seed)
+    density = len(authorizations) / max(1, len(users) * len(resources))
+    print(f"{len(users)} users, {len(resources)} resources, {args.rules} rules: {len(authorizations)} authorized pairs "
+          f"({density:.2%} of the pairs), {args.entries} log entries")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,20 +3,8 @@ import networkx as nx
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton
-import re
-
-
-def extract_data_from_log(file_path):
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-
-    data = []
-    for line in lines:
-        matches = re.findall(r'<(\d+),([^,]+),([^,]+),([^>]+)>', line)
-        if matches:
-            data += list(matches)
-
-    return data
+from itertools import chain
+from visualizer import extract_data_from_log
 
 
 def generate_data(data_):
@@ -150,9 +138,7 @@ if __name__ == '__main__':
 
     log_file = ["data.log"]  # set all log file path
 
-    data = []
-    for i in log_file:
-        data += extract_data_from_log(i)
+    data = chain.from_iterable(extract_data_from_log(i) for i in log_file)
     users, resources, operations = generate_data(data)
     G = nx.DiGraph()
     # print(operations)
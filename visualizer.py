@@ -1,235 +1,1179 @@
 import sys
 import argparse
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton
 import re
 import ast
-import numpy as np
+import gzip
+import hashlib
+import importlib.util
+import io
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from functools import cached_property
+from operator import itemgetter
+import profiling
+from abac_reader import BINARY_MAGIC, BINARY_HEADER, BINARY_VERSION, parse_policy
 
-# Function to extract data from log files
+# Function to import a module on the first use of one of its attributes, with importlib.util.LazyLoader
+# NumPy is only needed by the columnar counting, the time index and the graph index, not by the plain counting
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+np = lazy_import('numpy')
+
+LOG_PATTERN = re.compile(r'<(\d+),([^,\n]+),([^,\n]+),([^>\n]+)>')
+# same entries without the leading numeric field, findall then returns the (user, resource, operation) triples
+TRIPLE_PATTERN = re.compile(r'<\d+,([^,\n]+),([^,\n]+),([^>\n]+)>')
+READ_SIZE = 1 << 22
+# seconds between two reads of the followed log files
+FOLLOW_POLL = 0.25
+# bytes at the end of the last read of a followed file, checked again to detect a rewrite
+MARK_SIZE = 64
+# cached aggregate of a log file: magic, header (end, mtime_ns, path length, strings length, triples, fingerprint),
+# path, newline separated string table, uint32 (user, resource, operation) string ids and uint64 counts
+LOG_CACHE_MAGIC = b'ABACLOGC'
+LOG_CACHE_HEADER = struct.Struct('<QqQQQ32s')
+# bytes read backwards at a time to find the last newline of a log file
+LINE_SCAN_SIZE = 1 << 16
+
+# Function to open a log file as text, .gz and .zst files are decompressed on the fly
+def open_log(file_path):
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt')
+    if file_path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            print("Error: reading .zst logs requires the zstandard package")
+            exit(1)
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb')))
+    return open(file_path, 'r', buffering=READ_SIZE)
+
+# Function to read a log file by large blocks that always end on a line boundary
+def read_log_blocks(file_path):
+    with open_log(file_path) as file:
+        rest = ''
+        while True:
+            block = file.read(READ_SIZE)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind('\n') + 1
+            rest = block[end:]
+            if end:
+                yield block[:end]
+        if rest:
+            yield rest
+
+# Function to extract data from log files, the (timestamp, user, resource, operation) entries are generated lazily
 def extract_data_from_log(file_path):
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    for block in read_log_blocks(file_path):
+        yield from LOG_PATTERN.findall(block)
+
+# Function to count the (user, resource, operation) triples of a log file into operation_counts
+def count_log_file(file_path, operation_counts):
+    for block in read_log_blocks(file_path):
+        operation_counts.update(TRIPLE_PATTERN.findall(block))
+    return operation_counts
+
+# Follower of a growing log file, every call of read_blocks returns the complete lines appended since the last one
+# a rotated file (the path names a new file) is read to its end before the new file is opened,
+# a truncated file (copytruncate) is read again from its start, also when it was written again up to the same or
+# a larger size: the last bytes read are checked again once the mtime changed, a rewrite ending with the very same
+# bytes at the same offset is not detected
+class LogTail:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = None
+        self.rest = b''
+        self.mark = b''  # last MARK_SIZE bytes read
+        self.mtime = None  # mtime of the file before the last read
+
+    def open(self):
+        try:
+            self.file = open(self.file_path, 'rb')
+        except FileNotFoundError:
+            self.file = None
+        self.rest = b''
+        self.mark = b''
+        self.mtime = None
+        return self.file is not None
+
+    # Blocks of the lines appended since the last call, a line without its newline yet is kept for the next one
+    def read_blocks(self):
+        if self.file is None and not self.open():
+            return
+        if self.rewritten():
+            self.file.seek(0)
+            self.rest = b''
+            self.mark = b''
+        yield from self.read_appended()
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            # rotated away and not created again yet
+            return
+        current = os.fstat(self.file.fileno())
+        if (stat.st_dev, stat.st_ino) != (current.st_dev, current.st_ino):
+            if self.rest:
+                yield self.rest.decode('utf-8', errors='replace')
+            self.file.close()
+            if self.open():
+                yield from self.read_appended()
+        elif stat.st_size < self.file.tell():
+            self.file.seek(0)
+            self.rest = b''
+            yield from self.read_appended()
+
+    # Whether the file was truncated, or truncated and written again, since the last read
+    def rewritten(self):
+        position = self.file.tell()
+        stat = os.fstat(self.file.fileno())
+        if stat.st_size < position:
+            return True
+        if not self.mark or stat.st_mtime_ns == self.mtime:
+            return False
+        # seek and read rather than os.pread, which Windows does not have
+        self.file.seek(position - len(self.mark))
+        mark = self.file.read(len(self.mark))
+        self.file.seek(position)
+        return mark != self.mark
+
+    def read_appended(self):
+        self.mtime = os.fstat(self.file.fileno()).st_mtime_ns
+        while True:
+            block = self.file.read(READ_SIZE)
+            if not block:
+                break
+            self.mark = (self.mark + block[-MARK_SIZE:])[-MARK_SIZE:]
+            block = self.rest + block
+            end = block.rfind(b'\n') + 1
+            self.rest = block[end:]
+            if end:
+                yield block[:end].decode('utf-8', errors='replace')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+# Function to read the lines of a log file that start in the byte range [start, end), by large blocks
+# a line crossing end is read up to its end, the line containing start - 1 belongs to the previous range
+# with digest, a hashlib object, the bytes read up to end are hashed on the way, i.e. [start, end) when start is the
+# start of a line
+def read_log_range_blocks(file_path, start, end, digest=None):
+    with open(file_path, 'rb') as file:
+        if start > 0:
+            file.seek(start - 1)
+            file.readline()
+        position = file.tell()
+        rest = b''
+        while position < end:
+            block = file.read(min(READ_SIZE, end - position))
+            if not block:
+                break
+            if digest is not None:
+                digest.update(block)
+            position += len(block)
+            block = rest + block
+            if position >= end:
+                rest = b''
+                if not block.endswith(b'\n'):
+                    block += file.readline()
+            else:
+                cut = block.rfind(b'\n') + 1
+                block, rest = block[:cut], block[cut:]
+            yield block.decode('utf-8', errors='replace')
+        if rest:
+            yield rest.decode('utf-8', errors='replace')
+
+# Function to split the log files in tasks, plain files are cut in byte ranges and compressed files are read whole
+def split_log_files(file_paths, jobs, chunk_size=1 << 26):
+    tasks = []
+    for file_path in file_paths:
+        if file_path.endswith(('.gz', '.zst')):
+            tasks.append((file_path, 0, None))
+            continue
+        size = os.path.getsize(file_path)
+        step = max(READ_SIZE, min(chunk_size, -(-size // jobs)))
+        tasks += [(file_path, start, min(start + step, size)) for start in range(0, size, step)] or [(file_path, 0, 0)]
+    return tasks
+
+# Function to read the blocks of a task of split_log_files, a whole file when its end is None
+# digest hashes the bytes of a byte range, see read_log_range_blocks
+def task_blocks(task, digest=None):
+    file_path, start, end = task
+    return read_log_blocks(file_path) if end is None else read_log_range_blocks(file_path, start, end, digest)
 
-    data = []
-    for line in lines:
-        matches = re.findall(r'<(\d+),([^,]+),([^,]+),([^>]+)>', line)
-        if matches:
-            data += list(matches)
+# Function to pack the operation counts in a compact partial aggregate
+# a string table and the (user, resource, operation) string ids of every triple with its count
+def pack_counts(operation_counts):
+    strings = {}
+    ids = array('I')
+    counts = array('Q')
+    for triple, count in operation_counts.items():
+        for name in triple:
+            ids.append(strings.setdefault(name, len(strings)))
+        counts.append(count)
+    return list(strings), ids, counts
+
+# Function to add a partial aggregate to the operation counts
+def unpack_counts(partial, operation_counts):
+    strings, ids, counts = partial
+    for i, count in enumerate(counts):
+        triple = (strings[ids[3 * i]], strings[ids[3 * i + 1]], strings[ids[3 * i + 2]])
+        operation_counts[triple] = operation_counts.get(triple, 0) + count
+    return operation_counts
+
+# Function to count one log task in a worker process, or in this process with the digest of its byte range
+def _count_log_task(task, digest=None):
+    operation_counts = Counter()
+    for block in task_blocks(task, digest):
+        operation_counts.update(TRIPLE_PATTERN.findall(block))
+    return pack_counts(operation_counts)
+
+# Function to merge two partial aggregates in a worker process
+def _merge_partials(partials):
+    operation_counts = Counter()
+    for partial in partials:
+        unpack_counts(partial, operation_counts)
+    return pack_counts(operation_counts)
+
+# Function to count the log files in a process pool
+# every task returns a partial aggregate and the partials are merged pairwise, level by level
+# progress(done, total) is called when a task is counted
+def count_log_files_parallel(file_paths, jobs, progress=None):
+    tasks = split_log_files(file_paths, jobs)
+    with multiprocessing.Pool(jobs) as pool:
+        partials = []
+        for partial in pool.imap_unordered(_count_log_task, tasks):
+            partials.append(partial)
+            if progress:
+                progress(len(partials), len(tasks))
+        while len(partials) > 1:
+            pairs = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            partials = pool.map(_merge_partials, pairs)
+    operation_counts = Counter()
+    for partial in partials:
+        unpack_counts(partial, operation_counts)
+    return operation_counts
+
+# Function to hash the bytes [start, end) of a file into digest, a hashlib object
+def hash_range(file_path, start, end, digest):
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        while start < end:
+            block = file.read(min(end - start, READ_SIZE))
+            if not block:
+                break
+            digest.update(block)
+            start += len(block)
+    return digest
+
+# Function to fingerprint the first end bytes of a log file with a blake2b hash of all of them, a sample of the bytes
+# would miss a rewrite of the middle of the file; the hash object is returned so that the bytes appended to the file
+# can be added to it, the cache header keeps end apart
+def fingerprint(file_path, end):
+    return hash_range(file_path, 0, end, hashlib.blake2b(digest_size=32))
+
+# Function to find the end of the last complete line in the first size bytes of a log file
+def last_line_end(file_path, size):
+    with open(file_path, 'rb') as file:
+        end = size
+        while end > 0:
+            start = max(0, end - LINE_SCAN_SIZE)
+            file.seek(start)
+            cut = file.read(end - start).rfind(b'\n')
+            if cut >= 0:
+                return start + cut + 1
+            end = start
+    return 0
+
+# Function to name the cache file of a log file, from a hash of its absolute path
+def log_cache_path(cache_dir, file_path):
+    name = hashlib.blake2b(os.path.abspath(file_path).encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, name + '.bin')
+
+# Function to read the cached aggregate of a log file, None when there is none
+# returns the end of the counted bytes, their mtime_ns and fingerprint and the packed counts (see pack_counts)
+def read_log_cache(cache_dir, file_path):
+    try:
+        with open(log_cache_path(cache_dir, file_path), 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    if not data.startswith(LOG_CACHE_MAGIC) or len(data) < len(LOG_CACHE_MAGIC) + LOG_CACHE_HEADER.size:
+        return None
+    end, mtime_ns, path_size, strings_size, triples, digest = LOG_CACHE_HEADER.unpack_from(data, len(LOG_CACHE_MAGIC))
+    offset = len(LOG_CACHE_MAGIC) + LOG_CACHE_HEADER.size
+    if data[offset:offset + path_size].decode('utf-8') != os.path.abspath(file_path):
+        return None
+    offset += path_size
+    strings = data[offset:offset + strings_size].decode('utf-8').split('\n') if strings_size else []
+    offset += strings_size
+    ids = array('I', data[offset:offset + 12 * triples])
+    counts = array('Q', data[offset + 12 * triples:offset + 20 * triples])
+    return end, mtime_ns, digest, (strings, ids, counts)
+
+# Function to write the aggregate of the first end bytes of a log file to the cache, through a temporary file
+# digest is the fingerprint of these bytes
+def write_log_cache(cache_dir, file_path, end, mtime_ns, operation_counts, digest):
+    strings, ids, counts = pack_counts(operation_counts)
+    path = os.path.abspath(file_path).encode('utf-8')
+    table = "\n".join(strings).encode('utf-8')
+    cache_path = log_cache_path(cache_dir, file_path)
+    with open(cache_path + '.tmp', 'wb') as file:
+        file.write(LOG_CACHE_MAGIC)
+        file.write(LOG_CACHE_HEADER.pack(end, mtime_ns, len(path), len(table), len(counts), digest))
+        file.write(path)
+        file.write(table)
+        ids.tofile(file)
+        counts.tofile(file)
+    os.replace(cache_path + '.tmp', cache_path)
+
+# Function to count the log files with a cache of the aggregate of every file in cache_dir
+# a file whose size and mtime did not change is read from the cache without being read, otherwise the cached part
+# is hashed again: a plain file that was only appended to is counted from the end of its cached part, the others
+# are counted again
+# the hash of the cached part goes on over the counted part for the new fingerprint, a part counted by a single task
+# of this process is hashed as it is read, with the pool this process hashes it while the workers count
+# the last line without its newline is counted but not cached, the writer may not be done with it
+def count_log_files_cached(file_paths, cache_dir, jobs=1, progress=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    files = []
+    tasks = []
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        compressed = file_path.endswith(('.gz', '.zst'))
+        end = stat.st_size if compressed else last_line_end(file_path, stat.st_size)
+        start, cached, digest = 0, None, None
+        entry = read_log_cache(cache_dir, file_path)
+        if entry is not None:
+            cached_end, mtime_ns, cached_digest, partial = entry
+            # the end of the last complete line stands for the size, an incomplete last line is never cached
+            unchanged = mtime_ns == stat.st_mtime_ns and cached_end == end
+            # a compressed file is only reused whole, a plain one may have grown since
+            grown = cached_end == end or not compressed and cached_end < end
+            if unchanged:
+                start, cached = cached_end, partial
+            elif grown:
+                digest = fingerprint(file_path, cached_end)
+                if digest.digest() == cached_digest:
+                    start, cached = cached_end, partial
+                else:
+                    digest = None
+        if cached is None:
+            digest = hashlib.blake2b(digest_size=32)
+        files.append((file_path, start, end, stat, cached, len(tasks), digest))
+        if compressed:
+            tasks += [] if cached is not None else [(file_path, 0, None)]
+        else:
+            step = max(READ_SIZE, -(-(end - start) // jobs))
+            tasks += [(file_path, i, min(i + step, end)) for i in range(start, end, step)]
+            if end < stat.st_size:
+                tasks.append((file_path, end, stat.st_size))
+
+    # parts to hash, the ones read whole by a single plain task are hashed by it when it runs in this process
+    unhashed = {(file_path, start, end): digest for file_path, start, end, _, _, _, digest in files
+                if digest is not None and end > start}
+    partials = []
+    if jobs > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            results = pool.imap(_count_log_task, tasks)
+            for (file_path, start, end), digest in unhashed.items():
+                hash_range(file_path, start, end, digest)
+            for partial in results:
+                partials.append(partial)
+                if progress:
+                    progress(len(partials), len(tasks))
+    else:
+        for task in tasks:
+            partials.append(_count_log_task(task, unhashed.pop(task, None)))
+            if progress:
+                progress(len(partials), len(tasks))
+        # the parts left, e.g. the compressed files whose fingerprint is the one of the compressed bytes
+        for (file_path, start, end), digest in unhashed.items():
+            hash_range(file_path, start, end, digest)
+
+    operation_counts = Counter()
+    for i, (file_path, start, end, stat, cached, first, digest) in enumerate(files):
+        last = files[i + 1][5] if i + 1 < len(files) else len(tasks)
+        file_counts = Counter()
+        if cached is not None:
+            unpack_counts(cached, file_counts)
+        for task, partial in zip(tasks[first:last], partials[first:last]):
+            if task[2] is None or task[2] <= end:
+                unpack_counts(partial, file_counts)
+            else:
+                # the incomplete last line
+                unpack_counts(partial, operation_counts)
+        if digest is not None:
+            write_log_cache(cache_dir, file_path, end, stat.st_mtime_ns, file_counts, digest.digest())
+        operation_counts.update(file_counts)
+    return operation_counts
+
+# Interning table of names, an unknown name gets the next integer id
+class Interner(dict):
+    def __init__(self):
+        super().__init__()
+        self.names = []
 
-    return data
+    def __missing__(self, name):
+        value = self[name] = len(self.names)
+        self.names.append(name)
+        return value
+
+    def copy(self):
+        interner = Interner()
+        interner.update(self)
+        interner.names = self.names[:]
+        return interner
+
+# Columnar aggregate of log entries with NumPy
+# users, resources and operations are interned to integer ids and every block of entries is reduced to the counts
+# of its packed 64-bit (user, resource, operation) keys, kept sorted so that the rows of a user, and of a
+# (user, resource) pair, are contiguous; the consumers read the columns user_column, resource_column,
+# operation_column and counts instead of a {(user, resource, operation): count} dictionary
+class LogColumns:
+    USER_SHIFT = 40
+    RESOURCE_SHIFT = 16
+    RESOURCE_MASK = (1 << 24) - 1
+    OPERATION_MASK = (1 << 16) - 1
+
+    def __init__(self):
+        self.users = Interner()
+        self.resources = Interner()
+        self.operations = Interner()
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.pending = []
+
+    def __len__(self):
+        self.reduce()
+        return len(self.keys)
+
+    # Add a list of (user, resource, operation) triples
+    # the block is counted by a Counter first, so only its distinct triples are interned and packed
+    def add_triples(self, triples):
+        block = Counter(triples)
+        size = len(block)
+        users, resources, operations = (np.fromiter(map(table.__getitem__, map(itemgetter(i), block)), np.int64, size)
+                                        for i, table in enumerate((self.users, self.resources, self.operations)))
+        if len(self.users) >= 1 << 23 or len(self.resources) >= 1 << 24 or len(self.operations) >= 1 << 16:
+            print("Error: too many distinct users, resources or operations for the columnar aggregation")
+            exit(1)
+        keys = users << self.USER_SHIFT | resources << self.RESOURCE_SHIFT | operations
+        self.pending.append((keys, np.fromiter(block.values(), np.int64, size)))
+        if len(self.pending) >= 64:
+            self.reduce()
+
+    # Merge the counts of the pending blocks into keys and counts
+    def reduce(self):
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [keys for keys, _ in self.pending])
+        counts = np.concatenate([self.counts] + [counts for _, counts in self.pending])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.keys)).astype(np.int64)
+        self.pending = []
+
+    @property
+    def user_column(self):
+        self.reduce()
+        return self.keys >> self.USER_SHIFT
+
+    @property
+    def resource_column(self):
+        self.reduce()
+        return self.keys >> self.RESOURCE_SHIFT & self.RESOURCE_MASK
+
+    @property
+    def operation_column(self):
+        self.reduce()
+        return self.keys & self.OPERATION_MASK
+
+    # Total number of entries
+    def total(self):
+        self.reduce()
+        return int(self.counts.sum())
+
+    # Count of a (user, resource, operation) triple, a binary search in the sorted keys
+    def get(self, triple, default=None):
+        user, resource, operation = triple
+        ids = self.users.get(user), self.resources.get(resource), self.operations.get(operation)
+        if None in ids:
+            return default
+        self.reduce()
+        key = ids[0] << self.USER_SHIFT | ids[1] << self.RESOURCE_SHIFT | ids[2]
+        i = int(np.searchsorted(self.keys, key))
+        return int(self.counts[i]) if i < len(self.keys) and self.keys[i] == key else default
+
+    # Copy of the columns, the interners are copied so that the counting can go on
+    def snapshot(self):
+        self.reduce()
+        columns = LogColumns()
+        columns.users, columns.resources, columns.operations = (self.users.copy(), self.resources.copy(),
+                                                                self.operations.copy())
+        columns.keys, columns.counts = self.keys, self.counts
+        return columns
+
+# Time-bucketed index of log entries
+# every (user, resource, operation) triple gets an id and every entry the bucket timestamp // width, the counts of
+# the (triple, bucket) keys, packed as triple << 32 | bucket, are kept sorted with their prefix sums
+# so that the counts of any range of buckets take two binary searches per triple, without reading the logs again
+# only the entries with since <= timestamp <= until are indexed, so the first and last buckets are exact too
+class TimeIndex:
+    BUCKET_MASK = (1 << 32) - 1
+
+    def __init__(self, width=60, since=None, until=None):
+        self.width = width
+        self.since = since
+        self.until = until
+        self.triples = Interner()
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.cumulative = np.zeros(1, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.pending = []
+
+    # Add the (timestamp, user, resource, operation) entries of LOG_PATTERN
+    def add_entries(self, entries):
+        size = len(entries)
+        if not size:
+            return
+        timestamps = np.fromiter(map(int, map(itemgetter(0), entries)), np.int64, size)
+        if self.since is not None or self.until is not None:
+            keep = np.ones(size, dtype=bool)
+            if self.since is not None:
+                keep &= timestamps >= self.since
+            if self.until is not None:
+                keep &= timestamps <= self.until
+            if not keep.all():
+                entries = [entries[i] for i in np.flatnonzero(keep).tolist()]
+                timestamps = timestamps[keep]
+                size = len(entries)
+                if not size:
+                    return
+        buckets = timestamps // self.width
+        triples = np.fromiter(map(self.triples.__getitem__, map(itemgetter(1, 2, 3), entries)), np.int64, size)
+        if buckets[buckets.argmax()] > self.BUCKET_MASK or len(self.triples) >= 1 << 31:
+            print("Error: too many time buckets or triples for the time index, use a larger --time-bucket")
+            exit(1)
+        self.add_keys(*np.unique(triples << 32 | buckets, return_counts=True))
+
+    def add_keys(self, keys, counts):
+        self.pending.append((keys, counts))
+        if len(self.pending) >= 64:
+            self.reduce()
+
+    # Add the packed index of another process, its triple ids are mapped to the ones of this index
+    def add_partial(self, partial):
+        triples, keys, counts = partial
+        ids = np.fromiter(map(self.triples.__getitem__, triples), np.int64, len(triples))
+        self.add_keys(ids[keys >> 32] << 32 | keys & self.BUCKET_MASK, counts)
+
+    def pack(self):
+        self.reduce()
+        return self.triples.names, self.keys, self.counts
+
+    # Merge the pending keys and update the prefix sums
+    def reduce(self):
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [keys for keys, _ in self.pending])
+        counts = np.concatenate([self.counts] + [counts for _, counts in self.pending])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts, minlength=len(self.keys)).astype(np.int64)
+        self.cumulative = np.concatenate(([0], np.cumsum(self.counts)))
+        self.ids = np.unique(self.keys >> 32)
+        self.pending = []
+
+    # First and last bucket holding entries, None when the index is empty
+    def bucket_range(self):
+        self.reduce()
+        if not len(self.keys):
+            return None
+        buckets = self.keys & self.BUCKET_MASK
+        return int(buckets.min()), int(buckets.max())
+
+    # Counts of the triples in the buckets first to last included, {(user, resource, operation): count}
+    def counts_between(self, first=0, last=BUCKET_MASK):
+        self.reduce()
+        first, last = max(first, 0), min(last, self.BUCKET_MASK)
+        if first > last:
+            return {}
+        low = np.searchsorted(self.keys, self.ids << 32 | first)
+        high = np.searchsorted(self.keys, self.ids << 32 | last, side='right')
+        counts = self.cumulative[high] - self.cumulative[low]
+        keep = np.flatnonzero(counts)
+        names = self.triples.names
+        return {names[i]: count for i, count in zip(self.ids[keep].tolist(), counts[keep].tolist())}
+
+# Function to build the time index of a log task in a worker process
+def _time_index_task(task):
+    task, width, since, until = task
+    index = TimeIndex(width, since, until)
+    for block in task_blocks(task):
+        index.add_entries(LOG_PATTERN.findall(block))
+    return index.pack()
+
+# Function to build the time index of log files, with a process pool when jobs > 1
+# progress(done, total) is called when a task of split_log_files is indexed
+# only the entries with since <= timestamp <= until are indexed, None for no bound
+def count_log_time_index(file_paths, width, jobs=1, progress=None, since=None, until=None):
+    index = TimeIndex(width, since, until)
+    tasks = split_log_files(file_paths, jobs)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs) as pool:
+            partials = pool.imap_unordered(_time_index_task, [(task, width, since, until) for task in tasks])
+            for done, partial in enumerate(partials):
+                index.add_partial(partial)
+                if progress:
+                    progress(done + 1, len(tasks))
+    else:
+        for done, task in enumerate(tasks):
+            for block in task_blocks(task):
+                index.add_entries(LOG_PATTERN.findall(block))
+            if progress:
+                progress(done + 1, len(tasks))
+    index.reduce()
+    return index
+
+# Function to aggregate log files into a LogColumns
+def count_log_columns(file_paths, progress=None, partial=None, interval=1.0):
+    columns = LogColumns()
+    total = sum(os.path.getsize(file_path) for file_path in file_paths)
+    done = 0
+    deadline = time.monotonic() + interval
+    for file_path in file_paths:
+        size = os.path.getsize(file_path)
+        read = 0
+        for block in read_log_blocks(file_path):
+            triples = TRIPLE_PATTERN.findall(block)
+            profiling.count("log rows parsed", len(triples))
+            columns.add_triples(triples)
+            read += len(block)
+            if progress:
+                progress(done + min(read, size), total)
+            if partial and time.monotonic() > deadline:
+                partial(columns.snapshot())
+                interval *= 2
+                deadline = time.monotonic() + interval
+        done += size
+    columns.reduce()
+    return columns
+
+# Function to count the log files with the process pool (jobs > 1), the NumPy columns or a Counter
+# progress(done, total) is called after every block, in bytes, or every task of the pool
+# partial(operation_counts) gets a copy of the running counts of the sequential and columnar counting,
+# first after interval seconds and then at doubling intervals, so the copies stay a small part of the work
+# the files with a LogTail in tails are read through it, so that it goes on from where the counting stopped
+# with cache_dir, the aggregates of the files are cached there, see count_log_files_cached
+# with columnar, the result is a LogColumns, see count_log_columns
+# jobs and cache_dir are not used with tails or columnar, parse_data_arguments rejects them with --follow and
+# --columnar
+def count_log_files(file_paths, jobs=1, progress=None, partial=None, interval=1.0, tails=None, cache_dir=None,
+                    columnar=False):
+    tails = tails or {}
+    if columnar:
+        return count_log_columns(file_paths, progress, partial, interval)
+    if cache_dir and not tails:
+        return count_log_files_cached(file_paths, cache_dir, jobs, progress)
+    if jobs > 1 and not tails:
+        return count_log_files_parallel(file_paths, jobs, progress)
+    operation_counts = Counter()
+    total = sum(os.path.getsize(file_path) for file_path in file_paths)
+    done = 0
+    deadline = time.monotonic() + interval
+    for file_path in file_paths:
+        size = os.path.getsize(file_path)
+        read = 0
+        for block in tails[file_path].read_blocks() if file_path in tails else read_log_blocks(file_path):
+            triples = TRIPLE_PATTERN.findall(block)
+            profiling.count("log rows parsed", len(triples))
+            operation_counts.update(triples)
+            # the blocks of compressed files are longer than the file, they count up to its size
+            read += len(block)
+            if progress:
+                progress(done + min(read, size), total)
+            if partial and time.monotonic() > deadline:
+                partial(Counter(operation_counts))
+                interval *= 2
+                deadline = time.monotonic() + interval
+        done += size
+    return operation_counts
+
+# Function to count the (user, resource, operation) triples of log entries
+def count_log_entries(log_data, operation_counts=None):
+    if operation_counts is None:
+        operation_counts = Counter()
+    operation_counts.update((user, resource, operation) for _, user, resource, operation in log_data)
+    return operation_counts
 
 # Function to generate data from log data and ABAC authorizations
 def generate_data(log_data, authorizations):
+    return generate_data_from_counts(count_log_entries(log_data), authorizations)
+
+# Function to generate data from the operation counts and ABAC authorizations
+def generate_data_from_counts(operation_counts, authorizations):
     operations = {}
     users = set()
     resources = set()
-    operation_counts = {}  # Track the number of occurrences of each operation
 
-    for entry in log_data:
-        _, user, resource, operation = entry
+    for user, resource, operation in operation_counts:
         users.add(user)
         resources.add(resource)
-        auth_operations = authorizations.get((user, resource), set())
-        auth_operations.add(operation)  # Include operation based on authorization
+        if (user, resource) not in operations:
+            # copy the authorized operations, the observed ones must not leak into the authorizations
+            operations[(user, resource)] = set(authorizations.get((user, resource), ()))
+        operations[(user, resource)].add(operation)  # Include operation based on authorization
+
+    return list(users), list(resources), operations, operation_counts
 
-        # Count the occurrences of each operation
-        if (user, resource, operation) in operation_counts:
-            operation_counts[(user, resource, operation)] += 1
+# Memory-mapped reader of the binary authorization file written by abac_reader.write_binary
+# the columns are memoryviews over the file, the strings are decoded on first use
+# it behaves like the {(uid,rid):{operations}} dictionary of the text format
+class BinaryAuthorizations(Mapping):
+    def __init__(self, file_path):
+        if sys.byteorder == 'big':
+            print("Error: the binary authorization format requires a little endian host")
+            exit(1)
+        with open(file_path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.buffer)
+        if view[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            print("Error: Invalid authorization data")
+            exit(1)
+        version, n_users, n_resources, n_operations, n_pairs = BINARY_HEADER.unpack_from(self.buffer, len(BINARY_MAGIC))
+        if version != BINARY_VERSION:
+            print("Error: Unsupported authorization file version", version)
+            exit(1)
+        position = len(BINARY_MAGIC) + BINARY_HEADER.size
+        self.tables = []
+        for count in (n_users, n_resources, n_operations):
+            offsets, position = self.column(view, position, 'I', count + 1)
+            self.tables.append((offsets, view[position:position + offsets[count]]))
+            position += offsets[count] + (-offsets[count] % 8)
+        self.user_offsets, position = self.column(view, position, 'Q', n_users + 1)
+        self.user_ids, position = self.column(view, position, 'I', n_pairs)
+        self.resource_ids, position = self.column(view, position, 'I', n_pairs)
+        self.masks, position = self.column(view, position, 'Q', n_pairs)
+        self.decoded = {}
+
+    @staticmethod
+    def column(view, position, typecode, count):
+        size = struct.calcsize(typecode) * count
+        end = position + size + (-size % 8)
+        return view[position:position + size].cast(typecode), end
+
+    @staticmethod
+    def strings(table):
+        offsets, blob = table
+        blob = bytes(blob)
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    @cached_property
+    def users(self):
+        return self.strings(self.tables[0])
+
+    @cached_property
+    def resources(self):
+        return self.strings(self.tables[1])
+
+    @cached_property
+    def operations(self):
+        return self.strings(self.tables[2])
+
+    @cached_property
+    def user_index(self):
+        return {uid: i for i, uid in enumerate(self.users)}
+
+    @cached_property
+    def resource_index(self):
+        return {rid: i for i, rid in enumerate(self.resources)}
+
+    # Decode an operation bitmask into a new set of operations
+    def operations_of(self, mask):
+        if mask not in self.decoded:
+            self.decoded[mask] = [operation for i, operation in enumerate(self.operations) if mask >> i & 1]
+        return set(self.decoded[mask])
+
+    def __getitem__(self, key):
+        uid, rid = key
+        ui = self.user_index.get(uid)
+        ri = self.resource_index.get(rid)
+        if ui is not None and ri is not None:
+            start, end = self.user_offsets[ui], self.user_offsets[ui + 1]
+            i = bisect_left(self.resource_ids, ri, start, end)
+            if i < end and self.resource_ids[i] == ri:
+                return self.operations_of(self.masks[i])
+        raise KeyError(key)
+
+    def __iter__(self):
+        users, resources = self.users, self.resources
+        for ui, ri in zip(self.user_ids, self.resource_ids):
+            yield users[ui], resources[ri]
+
+    def __len__(self):
+        return len(self.masks)
+
+    def items(self):
+        users, resources = self.users, self.resources
+        for ui, ri, mask in zip(self.user_ids, self.resource_ids, self.masks):
+            yield (users[ui], resources[ri]), self.operations_of(mask)
+
+# Function to load the legacy text authorization file written by abac_reader
+def load_text_authorizations(file_path):
+    with open(file_path, 'r') as file:
+        # the first line is a list of usernames
+        users = file.readline().strip()[1:-1].split(',')
+        users = [user.strip()[1:-1] for user in users]
+        # the second line is a list of resources
+        resources = file.readline().strip()[1:-1].split(',')
+        resources = [resource.strip()[1:-1] for resource in resources]
+        # the third line is a dictionary of the form {(uid,rid):{operations}} it's corresponding of the authorization user/resource/operation
+        with profiling.span("literal_eval"):
+            data = ast.literal_eval(file.readline().strip())
+
+    # Verify if the parsed data is a dictionary
+    if not isinstance(data, dict):
+        print("Error: Invalid authorization data")
+        exit(1)
+    return users, resources, data
+
+# Function to load the authorization file written by abac_reader, in the binary or the legacy text format
+def load_authorizations(file_path):
+    with open(file_path, 'rb') as file:
+        binary = file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    with profiling.span("load_authorizations", format='binary' if binary else 'text'):
+        if binary:
+            authorizations = BinaryAuthorizations(file_path)
+            users, resources = authorizations.users, authorizations.resources
         else:
-            operation_counts[(user, resource, operation)] = 1
+            users, resources, authorizations = load_text_authorizations(file_path)
+    profiling.count("authorized pairs", len(authorizations))
+    return users, resources, authorizations
 
-        operations[(user, resource)] = auth_operations
+# Function to format the label of an edge: operation(occurrences),... with the operations sorted
+def edge_label(user, resource, auth_operations, operation_counts):
+    return ",".join(f"{operation}({operation_counts.get((user, resource, operation), 0)})"
+                    for operation in sorted(auth_operations))
 
-    return list(users), list(resources), operations, operation_counts
+# Function to apply the edges of an overlay to the neighbours and labels of a view
+# the labels of the known neighbours are replaced and the new neighbours are appended
+def overlay_view(neighbors, labels, overlay):
+    index = {node: k for k, node in enumerate(neighbors)}
+    labels = list(labels)
+    for node, label in overlay.items():
+        k = index.get(node)
+        if k is None:
+            neighbors.append(node)
+            labels.append(label)
+        else:
+            labels[k] = label
+    return neighbors, labels
+
+# Adjacency index of the user -> resource graph, built once at load time
+# CSR arrays in both directions, the edges of user i are user_indptr[i]:user_indptr[i + 1] in the edge arrays
+# and the edges of resource j are resource_edges[resource_indptr[j]:resource_indptr[j + 1]]
+# every edge keeps its preformatted label: operation(occurrences),...
+# the edges added or changed later by add_counts are kept in per-node overlays until the index is rebuilt
+class GraphIndex:
+    def __init__(self, operations, operation_counts):
+        self.operations = operations
+        self.operation_counts = operation_counts
+        self.users = Interner()
+        self.resources = Interner()
+        edges = sorted((self.users[user], self.resources[resource], user, resource, auth_operations)
+                       for (user, resource), auth_operations in operations.items())
+        self.edge_users = np.array([edge[0] for edge in edges], dtype=np.int64)
+        self.edge_resources = np.array([edge[1] for edge in edges], dtype=np.int64)
+        self.labels = [edge_label(user, resource, auth_operations, operation_counts)
+                       for _, _, user, resource, auth_operations in edges]
+        self.user_indptr = np.zeros(len(self.users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_users, minlength=len(self.users)), out=self.user_indptr[1:])
+        self.resource_edges = np.argsort(self.edge_resources, kind='stable')
+        self.resource_indptr = np.zeros(len(self.resources) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_resources, minlength=len(self.resources)), out=self.resource_indptr[1:])
+        self.user_overlay = {}
+        self.resource_overlay = {}
+        self.overlay_size = 0
+
+    # Graph index of a LogColumns, read from its columns without a {(user, resource, operation): count} dictionary
+    # the rows are sorted by (user, resource), so every edge is a run of rows and the CSR arrays come from the ids
+    @classmethod
+    def from_columns(cls, columns, authorizations):
+        graph = cls.__new__(cls)
+        graph.users = columns.users.copy()
+        graph.resources = columns.resources.copy()
+        graph.operation_counts = columns
+        pair_keys = columns.keys >> columns.RESOURCE_SHIFT
+        starts = np.flatnonzero(np.diff(pair_keys, prepend=-1))
+        graph.edge_users = columns.user_column[starts]
+        graph.edge_resources = columns.resource_column[starts]
+        user_names, resource_names, operation_names = graph.users.names, graph.resources.names, columns.operations.names
+        operation_ids, counts = columns.operation_column.tolist(), columns.counts.tolist()
+        bounds = starts.tolist() + [len(operation_ids)]
+        graph.operations = {}
+        graph.labels = []
+        for k, (user, resource) in enumerate(zip(graph.edge_users.tolist(), graph.edge_resources.tolist())):
+            pair = (user_names[user], resource_names[resource])
+            observed = {operation_names[operation_ids[i]]: counts[i] for i in range(bounds[k], bounds[k + 1])}
+            # copy the authorized operations, the observed ones must not leak into the authorizations
+            auth_operations = set(authorizations.get(pair, ()))
+            auth_operations.update(observed)
+            graph.operations[pair] = auth_operations
+            graph.labels.append(",".join(f"{operation}({observed.get(operation, 0)})"
+                                         for operation in sorted(auth_operations)))
+        graph.user_indptr = np.zeros(len(graph.users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(graph.edge_users, minlength=len(graph.users)), out=graph.user_indptr[1:])
+        graph.resource_edges = np.argsort(graph.edge_resources, kind='stable')
+        graph.resource_indptr = np.zeros(len(graph.resources) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(graph.edge_resources, minlength=len(graph.resources)), out=graph.resource_indptr[1:])
+        graph.user_overlay = {}
+        graph.resource_overlay = {}
+        graph.overlay_size = 0
+        return graph
+
+    # Add the counts of new (user, resource, operation) triples, the changed edges go to the overlays
+    # returns True when a new edge was added, i.e. when the neighbours of some views changed
+    def add_counts(self, counts, authorizations):
+        added = False
+        pairs = set()
+        for (user, resource, operation), count in counts.items():
+            self.operation_counts[(user, resource, operation)] = \
+                self.operation_counts.get((user, resource, operation), 0) + count
+            if (user, resource) not in self.operations:
+                # copy the authorized operations, the observed ones must not leak into the authorizations
+                self.operations[(user, resource)] = set(authorizations.get((user, resource), ()))
+                added = True
+            self.operations[(user, resource)].add(operation)
+            pairs.add((user, resource))
+        for user, resource in pairs:
+            label = edge_label(user, resource, self.operations[(user, resource)], self.operation_counts)
+            edges = self.user_overlay.setdefault(user, {})
+            self.overlay_size += resource not in edges
+            edges[resource] = label
+            self.resource_overlay.setdefault(resource, {})[user] = label
+        return added
+
+    # Resources of a user with the labels of the edges, None for an unknown user
+    def user_view(self, user):
+        i = self.users.get(user)
+        overlay = self.user_overlay.get(user)
+        if i is None:
+            return None if overlay is None else overlay_view([], [], overlay)
+        start, end = self.user_indptr[i], self.user_indptr[i + 1]
+        names = self.resources.names
+        view = [names[j] for j in self.edge_resources[start:end].tolist()], self.labels[start:end]
+        return view if overlay is None else overlay_view(*view, overlay)
+
+    # Users of a resource with the labels of the edges, None for an unknown resource
+    def resource_view(self, resource):
+        j = self.resources.get(resource)
+        overlay = self.resource_overlay.get(resource)
+        if j is None:
+            return None if overlay is None else overlay_view([], [], overlay)
+        edges = self.resource_edges[self.resource_indptr[j]:self.resource_indptr[j + 1]].tolist()
+        names = self.users.names
+        view = [names[i] for i in self.edge_users[edges].tolist()], [self.labels[e] for e in edges]
+        return view if overlay is None else overlay_view(*view, overlay)
 
 # Map operations to colors using a colormap
 def map_operations_to_colors(operations):
+    # matplotlib is only imported by the paths building views
+    from matplotlib import colormaps
+
     unique_operations = list(set(operations))
     num_unique_operations = len(unique_operations)
-    colormap = plt.get_cmap("tab20")
+    colormap = colormaps["tab20"]
     operation_colors = {
         operation: colormap(i % num_unique_operations)
         for i, operation in enumerate(unique_operations)
     }
     return operation_colors
 
-# PyQt5 Application for visualizing data
-class App(QWidget):
-    def __init__(self, graph, users, resources, authorizations, operation_colors, operation_counts):
-        super().__init__()
-        self.canvas = None
-        self.switch_button = None
-        self.resource_combo = None
-        self.resource_label = None
-        self.user_combo = None
-        self.user_label = None
-        self.user_color = "#AEC6CF"
-        self.resource_color = '#FFD700'
-        self.users = users
-        self.resources = resources
-        self.G = graph
-        self.authorizations = authorizations
-        self.operation_colors = operation_colors
-        self.operation_counts = operation_counts  # Store the operation counts
-        self.show_users = True  # Initialize to show user view
-        self.init_ui()
-        self.update_ui()
-
-    def init_ui(self):
-        self.setWindowTitle("Log Viewer")
-        self.setGeometry(100, 100, 800, 600)
-
-        # Create layouts
-        main_layout = QVBoxLayout()
-        user_layout = QHBoxLayout()
-        resource_layout = QHBoxLayout()
-        switch_layout = QHBoxLayout()
-
-        # User selection
-        self.user_label = QLabel("User:")
-        self.user_combo = QComboBox()
-        self.user_combo.addItems(self.users)
-        user_layout.addWidget(self.user_label)
-        user_layout.addWidget(self.user_combo)
-
-        # Resource selection
-        self.resource_label = QLabel("Resource:")
-        self.resource_combo = QComboBox()
-        self.resource_combo.addItems(self.resources)
-        resource_layout.addWidget(self.resource_label)
-        resource_layout.addWidget(self.resource_combo)
-
-        # Switch button
-        self.switch_button = QPushButton("Switch to Resources" if self.show_users else "Switch to Users")
-        switch_layout.addWidget(self.switch_button)
-
-        # Add layouts to the main layout
-        main_layout.addLayout(user_layout)
-        main_layout.addLayout(resource_layout)
-        main_layout.addLayout(switch_layout)
-
-        # Create a canvas for graph visualization
-        self.canvas = FigureCanvas(plt.figure())
-        main_layout.addWidget(self.canvas)
-
-        # Connect signals to slots
-        self.user_combo.currentIndexChanged.connect(self.update_ui)
-        self.resource_combo.currentIndexChanged.connect(self.update_ui)
-        self.switch_button.clicked.connect(self.toggle_view)
-
-        # Set the main layout
-        self.setLayout(main_layout)
-
-    def toggle_view(self):
-        self.show_users = not self.show_users
-        self.switch_button.setText("Switch to Resources" if self.show_users else "Switch to Users")
-        self.update_ui()
-
-    def update_ui(self):
-        selected_user = self.user_combo.currentText()
-        selected_resource = self.resource_combo.currentText()
-
-        self.user_label.setVisible(self.show_users)
-        self.user_combo.setVisible(self.show_users)
-        self.resource_label.setVisible(not self.show_users)
-        self.resource_combo.setVisible(not self.show_users)
-
-        # Clear the previous graph and draw the new subgraph with operations
-        plt.clf()
-
-        subgraph = nx.DiGraph()  # Initialize an empty subgraph
-
-        if self.show_users:
-            if selected_user:
-                if selected_user in self.G:
-                    # Create a subgraph showing all resources connected to the selected user
-                    subgraph.add_node(selected_user, color=self.user_color)
-                    for resource in self.G.successors(selected_user):
-                        operation = self.G[selected_user][resource]["operation"]
-                        subgraph.add_node(resource, color=self.resource_color)
-                        subgraph.add_edge(selected_user, resource, operation=operation)
+# Function to format a timestamp of the logs as a UTC date, timestamps that are not in seconds are kept as they are
+def format_time(timestamp):
+    try:
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    except (OverflowError, OSError, ValueError):
+        return str(timestamp)
+
+# Function to parse a --since or --until value, a timestamp of the logs or an ISO date (UTC unless it has an offset)
+def parse_time(value):
+    if value.isdigit():
+        return int(value)
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid timestamp or ISO date: {value}")
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
+# Function to index the counted operations for the views
+# returns the arguments of App.set_data: graph, users, resources, authorizations, colors, counts and attributes
+# time_index and time_window, the first and last buckets of the counts, are kept for the time-range sliders
+def build_view_data(operation_counts, users, resources, authorizations, attributes=None, time_index=None,
+                    time_window=None):
+    with profiling.span("graph_index", triples=len(operation_counts)):
+        if isinstance(operation_counts, LogColumns):
+            graph = GraphIndex.from_columns(operation_counts, authorizations)
+            operations = graph.operations
         else:
-            if selected_resource:
-                if selected_resource in self.G:
-                    # Create a subgraph showing all users connected to the selected resource
-                    subgraph.add_node(selected_resource, color=self.resource_color)
-                    for user in self.G.predecessors(selected_resource):
-                        operation = self.G[user][selected_resource]["operation"]
-                        subgraph.add_node(user, color=self.user_color)
-                        subgraph.add_edge(user, selected_resource, operation=operation)
-
-        pos = nx.spring_layout(subgraph)
-        colors = [subgraph.nodes[node].get("color", self.user_color) for node in subgraph.nodes()]
-
-        # Add labels to edges (links) with the number of occurrences
-        edge_labels = {}
-        for u, v, data in subgraph.edges(data=True):
-            operation = data.get("operation", "").split(",")
-            operation = [operation.strip() for operation in operation]
-            l=""
-            for i in operation:
-                occurrences = self.operation_counts.get((u, v, i), 0)
-                l+=f"{i}({occurrences}),"
-            l = l[:-1]
-            edge_labels[(u, v)] = l
-
-        # Draw nodes and edges
-        nx.draw(subgraph, pos, with_labels=True, node_color=colors, font_color="black",
-                node_size=1000, font_size=10, font_weight="bold", width=2)
-
-        nx.draw_networkx_edge_labels(subgraph, pos, edge_labels=edge_labels, font_color='red')
-
-        plt.title("ABAC Log Visualization")
-
-        # Draw the graph on the canvas
-        self.canvas.draw()
+            _, _, operations, operation_counts = generate_data_from_counts(operation_counts, authorizations)
+            graph = GraphIndex(operations, operation_counts)
+    profiling.count("graph edges", len(operations))
+    return {
+        'graph': graph,
+        'users': users,
+        'resources': resources,
+        'authorizations': authorizations,
+        'operation_colors': map_operations_to_colors(set(operation for auth_operations in operations.values()
+                                                         for operation in auth_operations)),
+        'operation_counts': operation_counts,
+        'attributes': attributes,
+        'time_index': time_index,
+        'time_window': time_window,
+    }
+
+# Function to load the authorizations, the policy attributes and the logs of the command line arguments
+# progress(percent, message) reports the advancement and partial(data) receives the views of the logs counted so far
+# with tails, the plain log files are read through their LogTail so that they can be followed afterwards
+def load_data(args, progress=None, partial=None, tails=None):
+    progress = progress or (lambda percent, message: None)
+    progress(0, "Loading the authorizations")
+    users, resources, authorizations = load_authorizations(args.auth_file)
+    # Attributes of the policy, to group the neighbours of high-degree nodes
+    attributes = None
+    if args.policy:
+        progress(0, "Parsing the policy")
+        policy_users, policy_resources, _ = parse_policy(args.policy)
+        attributes = ({user['uid']: user for user in policy_users},
+                      {resource['rid']: resource for resource in policy_resources})
+
+    def publish(operation_counts):
+        partial(build_view_data(operation_counts, users, resources, authorizations, attributes))
+
+    def report(done, total):
+        progress(100 * done // max(total, 1), "Counting the logs")
+
+    if args.time_bucket:
+        # Index the entries by time bucket, the views count the entries between --since and --until
+        with profiling.span("count_logs", time_bucket=args.time_bucket, jobs=args.jobs):
+            time_index = count_log_time_index(args.log_file, args.time_bucket, args.jobs, report, args.since,
+                                              args.until)
+            operation_counts = time_index.counts_between()
+        time_window = time_index.bucket_range()
+        progress(100, "Indexing the graph")
+        return build_view_data(operation_counts, users, resources, authorizations, attributes, time_index, time_window)
+
+    # Count the operations of the log files, one block at a time
+    with profiling.span("count_logs", jobs=args.jobs, columnar=args.columnar, cache=bool(args.cache_dir)):
+        operation_counts = count_log_files(args.log_file, args.jobs, report, publish if partial else None,
+                                           tails=tails, cache_dir=args.cache_dir, columnar=args.columnar)
+    if profiling.enabled():
+        profiling.count("log entries", operation_counts.total() if args.columnar else sum(operation_counts.values()))
+    progress(100, "Indexing the graph")
+    return build_view_data(operation_counts, users, resources, authorizations, attributes)
+
+# Function to add the arguments selecting the data of the views to a parser, shared with the export subcommand
+def add_data_arguments(parser):
+    from layout import LAYOUTS
 
-def main():
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description="ABAC Log Visualizer")
     parser.add_argument("-a","--auth_file", type=str, help="Path to the log data file")
     parser.add_argument("-l", "--log_file", nargs='+', type=str, help="Paths to authorization data files")
-    args = parser.parse_args()
-    # Extract data from log files
-    log_data = []
-    for file_path in args.log_file:
-        log_data += extract_data_from_log(file_path)
-
-    with open(args.auth_file, 'r') as file:
-        # the first line is a list of usernames
-        users = file.readline().strip()[1:-1].split(',')
-        users = [user.strip()[1:-1] for user in users]
-        # the second line is a list of resources
-        resources = file.readline().strip()[1:-1].split(',')
-        resources = [resource.strip()[1:-1] for resource in resources]
-        # the third line is a dictionary of the form {(uid,rid):{operations}} it's corresponding of the authorization user/resource/operation
-        data = ast.literal_eval(file.readline().strip())
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes parsing the log files")
+    parser.add_argument("--columnar", action='store_true',
+                        help="Count the log entries with NumPy arrays of interned ids, the views read the columns")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="radial",
+                        help="Layout of the views, spring is warm started from the cached positions")
+    parser.add_argument("-p", "--policy", type=str,
+                        help="Path to the .abac policy, the neighbours of high-degree nodes are grouped by attribute")
+    parser.add_argument("--cluster-attr", type=str, default="project",
+                        help="Attribute grouping the neighbours of high-degree nodes, e.g. project or type")
+    parser.add_argument("--cache-dir", type=str,
+                        help="Directory caching the counts of every log file, unchanged files are not read again")
+    parser.add_argument("--time-bucket", type=int,
+                        help="Index the entries by buckets of this many timestamp units and show a time range, "
+                             "60 when --since or --until is given")
+    parser.add_argument("--since", type=parse_time, help="Only count the entries from this timestamp or ISO date")
+    parser.add_argument("--until", type=parse_time, help="Only count the entries up to this timestamp or ISO date")
+    profiling.add_arguments(parser)
 
-        # Verify if the parsed data is a dictionary
-        if isinstance(data, dict):
-            authorizations = data
-        else:
-            print("Error: Invalid authorization data")
+# Function to parse the command line arguments of a parser with the data arguments
+def parse_data_arguments(parser, argv=None):
+    args = parser.parse_args(argv)
+    if getattr(args, 'follow', False):
+        # the followed files are counted by this process without a time index, these options would be left unused
+        if args.time_bucket is not None or args.since is not None or args.until is not None:
+            print("Error: --follow cannot be used with --time-bucket, --since or --until")
             exit(1)
+        if args.cache_dir or args.jobs > 1:
+            print("Error: --follow cannot be used with --cache-dir or -j")
+            exit(1)
+    if args.columnar:
+        # the columns are counted by this process from the plain blocks of the files
+        if getattr(args, 'follow', False) or args.cache_dir or args.jobs > 1:
+            print("Error: --columnar cannot be used with --follow, --cache-dir or -j")
+            exit(1)
+        if args.time_bucket is not None or args.since is not None or args.until is not None:
+            print("Error: --columnar cannot be used with --time-bucket, --since or --until, the time index has its "
+                  "own columns")
+            exit(1)
+    if args.cache_dir and (args.time_bucket is not None or args.since is not None or args.until is not None):
+        # the cache holds the totals of the files, the time index is built from the entries
+        print("Error: --cache-dir cannot be used with --time-bucket, --since or --until")
+        exit(1)
+    if args.time_bucket is None and (args.since is not None or args.until is not None):
+        args.time_bucket = 60
+    return args
+
+def main():
+    # The export subcommand renders the views without a window, see export.py
+    if sys.argv[1:2] == ["export"]:
+        from export import main as export_main
+        export_main(sys.argv[2:])
+        return
+
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description="ABAC Log Visualizer, see `visualizer.py export -h` for the "
+                                                 "headless export")
+    add_data_arguments(parser)
+    parser.add_argument("--follow", action='store_true',
+                        help="Keep reading the entries appended to the log files, "
+                             "rotated and truncated files are detected")
+    parser.add_argument("--refresh", type=float, default=1.0,
+                        help="Seconds between two updates of the views with the followed entries")
+    args = parse_data_arguments(parser)
+    profiling.start_from_arguments(args)
+
+    # The Qt modules are only imported to open the window
+    from PyQt5.QtWidgets import QApplication
+    from app import App
 
-        # Generate data for visualization, including operation counts
-        _, _, operations, operation_counts = generate_data(log_data, authorizations)
-        # Create a directed graph
-        G = nx.DiGraph()
-        for (user, resource), auth_operations in operations.items():
-            G.add_edge(user, resource, operation=", ".join(auth_operations))
-
-        # Map operations to colors using a colormap
-        operation_colors = map_operations_to_colors(set(operation for auth_operations in operations.values() for operation in auth_operations))
-
-        # Create the PyQt5 application
-        app = QApplication(sys.argv)
-        window = App(G, users, resources, authorizations, operation_colors, operation_counts)
-        window.show()
-        sys.exit(app.exec_())
+    # Open the window at once, the logs, authorizations and policy are loaded in the background
+    app = QApplication(sys.argv)
+    window = App(GraphIndex({}, {}), [], [], {}, {}, {}, args.layout, None, args.cluster_attr)
+    app.aboutToQuit.connect(window.stop_loading)
+    window.show()
+    window.start_loading(args)
+    sys.exit(app.exec_())
 
 if __name__ == "__main__":
     main()